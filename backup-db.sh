@@ -34,9 +34,18 @@ fi
 # Backup filename
 BACKUP_FILE="$BACKUP_DIR/trading_bot_$DATE.db"
 
-# Copy database
+# Copy database with SQLite's online backup, which includes rows still in
+# the -wal file (a plain cp of the .db file would miss them)
+if ! command -v sqlite3 > /dev/null; then
+    echo "Error: sqlite3 command not found (install the sqlite3 package)"
+    exit 1
+fi
+
 echo "Starting backup at $(date)"
-cp $DB_FILE $BACKUP_FILE
+if ! sqlite3 "$DB_FILE" ".backup '$BACKUP_FILE'"; then
+    echo "Error: SQLite backup failed!"
+    exit 1
+fi
 
 # Compress backup
 gzip $BACKUP_FILE
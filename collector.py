@@ -5,10 +5,12 @@ Version: 2.0
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
+import threading
 import json
 import os
 from typing import Dict, List, Optional, Tuple
@@ -17,6 +19,13 @@ from dataclasses import dataclass
 from enum import Enum
 import csv
 
+# Faster JSON parsing for exchange responses
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -64,6 +73,12 @@ class CryptoDataCollector:
     def __init__(self, cache_dir: str = "data_cache"):
         self.cache_dir = cache_dir
         self.last_request_time = {}
+        self._rate_lock = threading.Lock()  # collector is shared across worker threads
+
+        # Pooled HTTP session: keep-alive connections are reused across requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        self.session.mount("https://", adapter)
         
         # Create cache directory
         os.makedirs(cache_dir, exist_ok=True)
@@ -75,15 +90,18 @@ class CryptoDataCollector:
     def _rate_limit(self, exchange: Exchange):
         """Implement rate limiting"""
         exchange_name = exchange.value.name
-        current_time = time.time()
-        
-        if exchange_name in self.last_request_time:
-            elapsed = current_time - self.last_request_time[exchange_name]
-            if elapsed < exchange.value.rate_limit:
-                sleep_time = exchange.value.rate_limit - elapsed
-                time.sleep(sleep_time)
-        
-        self.last_request_time[exchange_name] = time.time()
+
+        # Reserve the next request slot under the lock, then sleep outside it,
+        # so threads queue for their own slot instead of serialising on the lock
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = now
+            if exchange_name in self.last_request_time:
+                slot = max(now, self.last_request_time[exchange_name] + exchange.value.rate_limit)
+            self.last_request_time[exchange_name] = slot
+
+        if slot > now:
+            time.sleep(slot - now)
     
     def _save_to_cache(self, df: pd.DataFrame, exchange: str, symbol: str, 
                       interval: str, filename: str = None):
@@ -179,10 +197,10 @@ class CryptoDataCollector:
         
         try:
             logger.info(f"Fetching Binance data: {symbol} {interval} x{limit}")
-            response = requests.get(url, params=params, timeout=15)
+            response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
             
-            data = response.json()
+            data = _json_loads(response.content)
             
             if not data:
                 logger.warning(f"No data returned for {symbol}")
@@ -222,7 +240,8 @@ class CryptoDataCollector:
             logger.error(f"Unexpected error fetching Binance data: {e}")
             return None
 
-    def get_binance_24h_ticker(self, symbol: str) -> Optional[Dict]:
+    def get_binance_24h_ticker(self, symbol: str, market: str = "spot",
+                               log_errors: bool = True) -> Optional[Dict]:
         """
         Get 24-hour ticker data from Binance
 
@@ -230,6 +249,10 @@ class CryptoDataCollector:
         -----------
         symbol : str
             Trading pair (e.g., "BTCUSDT", "ETHUSDT")
+        market : str
+            "spot" (api/v3) or "futures" (USD-M fapi/v1)
+        log_errors : bool
+            Log failures at error level (debug when a fallback follows)
 
         Returns:
         --------
@@ -239,15 +262,18 @@ class CryptoDataCollector:
         self._rate_limit(Exchange.BINANCE)
 
         # Prepare request
-        url = f"{Exchange.BINANCE.value.base_url}/api/v3/ticker/24hr"
+        if market == "futures":
+            url = "https://fapi.binance.com/fapi/v1/ticker/24hr"
+        else:
+            url = f"{Exchange.BINANCE.value.base_url}/api/v3/ticker/24hr"
         params = {"symbol": symbol.upper()}
 
         try:
-            logger.info(f"Fetching Binance 24h ticker: {symbol}")
-            response = requests.get(url, params=params, timeout=15)
+            logger.info(f"Fetching Binance {market} 24h ticker: {symbol}")
+            response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
 
-            data = response.json()
+            data = _json_loads(response.content)
 
             # Parse relevant data
             ticker_data = {
@@ -278,13 +304,75 @@ class CryptoDataCollector:
             return ticker_data
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Network error fetching Binance 24h ticker: {e}")
+            log = logger.error if log_errors else logger.debug
+            log(f"Network error fetching Binance {market} 24h ticker: {e}")
             return None
         except Exception as e:
-            logger.error(f"Unexpected error fetching Binance 24h ticker: {e}")
+            log = logger.error if log_errors else logger.debug
+            log(f"Unexpected error fetching Binance {market} 24h ticker: {e}")
             return None
 
+    def get_24h_ticker(self, symbol: str, exchange: str = "binance",
+                       market: str = "auto") -> Optional[Dict]:
+        """
+        Get 24-hour ticker for the given exchange and market preference.
+        For Binance "auto" tries futures first, then spot (like get_binance_klines_auto).
+        """
+        if exchange == "bybit":
+            return self.get_bybit_24h_ticker(symbol)
+
+        if market in ("spot", "futures"):
+            return self.get_binance_24h_ticker(symbol, market=market)
+
+        # Spot-only symbols fail on futures; that miss is expected, so keep it quiet
+        return (self.get_binance_24h_ticker(symbol, market="futures", log_errors=False)
+                or self.get_binance_24h_ticker(symbol, market="spot"))
+
     # ============ BYBIT METHODS ============
+    def get_bybit_24h_ticker(self, symbol: str, category: str = "spot") -> Optional[Dict]:
+        """
+        Get 24-hour ticker data from Bybit
+
+        Returns:
+        --------
+        Dict with the same keys as get_binance_24h_ticker for price, change,
+        high/low and volume (other Binance-only fields are omitted)
+        """
+        # Apply rate limiting
+        self._rate_limit(Exchange.BYBIT)
+
+        url = f"{Exchange.BYBIT.value.base_url}/v5/market/tickers"
+        params = {"category": category, "symbol": symbol.upper()}
+
+        try:
+            logger.info(f"Fetching Bybit 24h ticker: {symbol}")
+            response = self.session.get(url, params=params, timeout=15)
+            response.raise_for_status()
+
+            data = _json_loads(response.content)
+
+            if data.get('retCode') != 0 or not data.get('result', {}).get('list'):
+                logger.warning(f"Bybit ticker error for {symbol}: {data.get('retMsg')}")
+                return None
+
+            t = data['result']['list'][0]
+            return {
+                'symbol': t.get('symbol'),
+                'last_price': float(t.get('lastPrice', 0)),
+                'price_change_percent': float(t.get('price24hPcnt', 0)) * 100,  # Bybit returns a fraction
+                'high_price': float(t.get('highPrice24h', 0)),
+                'low_price': float(t.get('lowPrice24h', 0)),
+                'volume': float(t.get('volume24h', 0)),
+                'quote_volume': float(t.get('turnover24h', 0)),
+            }
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Network error fetching Bybit 24h ticker: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error fetching Bybit 24h ticker: {e}")
+            return None
+
     def get_bybit_klines(self, symbol: str = "BTCUSDT",
                         interval: str = "1h",
                         limit: int = 200,
@@ -325,10 +413,10 @@ class CryptoDataCollector:
         
         try:
             logger.info(f"Fetching Bybit data: {symbol} {interval} x{limit}")
-            response = requests.get(url, params=params, timeout=15)
+            response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
             
-            data = response.json()
+            data = _json_loads(response.content)
             
             if data.get('retCode') != 0:
                 logger.error(f"Bybit API error: {data.get('retMsg')}")
@@ -587,10 +675,10 @@ class CryptoDataCollector:
             }
 
             logger.info(f"Trying Binance Futures: {symbol}")
-            response = requests.get(url, params=params, timeout=15)
+            response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
 
-            data = response.json()
+            data = _json_loads(response.content)
 
             if not data or isinstance(data, dict) and 'code' in data:
                 logger.warning(f"Futures API error for {symbol}: {data}")
@@ -626,6 +714,17 @@ class CryptoDataCollector:
             return None
 
 # ============ HELPER FUNCTIONS ============
+_shared_collector: Optional[CryptoDataCollector] = None
+
+
+def get_collector() -> CryptoDataCollector:
+    """Get or create the process-wide collector (shares HTTP pool and rate limits)"""
+    global _shared_collector
+    if _shared_collector is None:
+        _shared_collector = CryptoDataCollector()
+    return _shared_collector
+
+
 def get_common_pairs() -> Dict[str, List[str]]:
     """Get commonly traded pairs"""
     return {
@@ -6,6 +6,7 @@ Output terstruktur untuk trading plan lengkap
 import requests
 import json
 import time
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
 import pandas as pd
@@ -15,7 +16,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 
 from config import config
-from collector import CryptoDataCollector
+from collector import CryptoDataCollector, get_collector
 
 logger = logging.getLogger(__name__)
 
@@ -108,9 +109,9 @@ class TradingPlanGenerator:
     Generate detailed trading plans using DeepSeek AI
     """
     
-    def __init__(self, deepseek_config=None):
+    def __init__(self, deepseek_config=None, collector: Optional[CryptoDataCollector] = None):
         self.config = deepseek_config or config.DEEPSEEK
-        self.collector = CryptoDataCollector()
+        self.collector = collector or CryptoDataCollector()
         self.session = requests.Session()
         
         # Setup session
@@ -121,20 +122,25 @@ class TradingPlanGenerator:
         })
         
         # Rate limiting
-        self.last_request_time = 0
+        self.last_request_time = None  # monotonic time of the last reserved slot
         self.request_delay = 1.0
+        self._rate_lock = threading.Lock()  # shared generator runs plans on several threads
         
         logger.info("Trading Plan Generator initialized")
     
     def _rate_limit(self):
         """Rate limiting"""
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time
-        
-        if elapsed < self.request_delay:
-            time.sleep(self.request_delay - elapsed)
-        
-        self.last_request_time = time.time()
+        # Reserve the next request slot under the lock, then sleep outside it,
+        # so threads queue for their own slot instead of serialising on the lock
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = now
+            if self.last_request_time is not None:
+                slot = max(now, self.last_request_time + self.request_delay)
+            self.last_request_time = slot
+
+        if slot > now:
+            time.sleep(slot - now)
     
     # ============ TRADING PLAN PROMPT ============
     def _create_trading_plan_prompt(self, df: pd.DataFrame, request: AnalysisRequest) -> str:
@@ -396,9 +402,11 @@ class TradingPlanGenerator:
         return float(macd.iloc[-1]), float(signal.iloc[-1])
     
     # ============ GENERATE TRADING PLAN ============
-    def generate_trading_plan(self, request: AnalysisRequest) -> TradingPlan:
+    def generate_trading_plan(self, request: AnalysisRequest,
+                              df: Optional[pd.DataFrame] = None) -> TradingPlan:
         """
         Generate complete trading plan
+        Pass df to reuse klines the caller already fetched
         """
         start_time = time.time()
 
@@ -409,20 +417,21 @@ class TradingPlanGenerator:
             # Get data
             logger.info(f"Generating trading plan for {request.symbol} ({request.timeframe})...")
 
-            if request.symbol.endswith('USDT'):
-                # Use auto-detect to support both spot and futures
-                df = self.collector.get_binance_klines_auto(
-                    symbol=request.symbol,
-                    interval=request.timeframe,
-                    limit=request.data_points
-                )
-            else:
-                df = self.collector.get_bybit_klines(
-                    symbol=request.symbol,
-                    interval=request.timeframe,
-                    limit=min(request.data_points, 200)
-                )
-            
+            if df is None:
+                if request.symbol.endswith('USDT'):
+                    # Use auto-detect to support both spot and futures
+                    df = self.collector.get_binance_klines_auto(
+                        symbol=request.symbol,
+                        interval=request.timeframe,
+                        limit=request.data_points
+                    )
+                else:
+                    df = self.collector.get_bybit_klines(
+                        symbol=request.symbol,
+                        interval=request.timeframe,
+                        limit=min(request.data_points, 200)
+                    )
+
             if df is None or len(df) < 20:
                 raise ValueError(f"Insufficient data for {request.symbol}")
             
@@ -829,6 +838,16 @@ class TradingPlanGenerator:
         logger.info(f"Trading plan exported to CSV: {filepath}")
         return filepath
 
+_shared_generator: Optional[TradingPlanGenerator] = None
+
+
+def get_plan_generator() -> TradingPlanGenerator:
+    """Get or create the shared plan generator (reuses the shared collector)"""
+    global _shared_generator
+    if _shared_generator is None:
+        _shared_generator = TradingPlanGenerator(collector=get_collector())
+    return _shared_generator
+
 # ============ EXAMPLE USAGE ============
 def main():
     """Example of generating and displaying trading plan"""
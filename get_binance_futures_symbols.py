@@ -7,6 +7,7 @@ Fetch all available trading pairs from Binance Futures
 import requests
 import json
 from datetime import datetime
+from operator import itemgetter
 
 def get_binance_futures_symbols():
     """Get all USDT-M futures symbols from Binance"""
@@ -40,7 +41,7 @@ def get_binance_futures_symbols():
                 })
 
         # Sort by symbol
-        usdt_pairs.sort(key=lambda x: x['symbol'])
+        usdt_pairs.sort(key=itemgetter('symbol'))
 
         print(f"\n✅ Found {len(usdt_pairs)} USDT-M perpetual futures pairs\n")
 
@@ -130,7 +131,7 @@ def get_top_volume_symbols(limit=20):
         ]
 
         # Sort by volume (descending)
-        usdt_tickers.sort(key=lambda x: x['volume'], reverse=True)
+        usdt_tickers.sort(key=itemgetter('volume'), reverse=True)
 
         # Get top N
         top_tickers = usdt_tickers[:limit]
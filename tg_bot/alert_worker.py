@@ -5,26 +5,55 @@ Periodically checks price alerts and sends notifications when triggered
 
 import logging
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
-from telegram import Bot
-from telegram.error import TelegramError
+from typing import Any, Dict, List, Optional
 
 from config import config
 from tg_bot.database import db
 from tg_bot.formatter import TelegramFormatter
-from collector import CryptoDataCollector
+from tg_bot.rate_limit import create_worker_bot, send_message
+from collector import get_collector
 
 logger = logging.getLogger(__name__)
 
+# Dedicated pool for price fetches; the collector's rate limiter sleeps in
+# these threads instead of on the event loop or the handlers' default executor
+_PRICE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="alert")
+
 
 class AlertWorker:
     """Background worker for checking and triggering price alerts"""
 
     def __init__(self, bot_token: str):
         """Initialize alert worker"""
-        self.bot = Bot(token=bot_token)
-        self.collector = CryptoDataCollector()
+        self.bot = create_worker_bot(bot_token)
+        self.collector = get_collector()
+
+    def _fetch_price(self, symbol: str, exchange_pref: str, market_pref: str) -> Optional[float]:
+        """Fetch the latest 1m close for a symbol based on user preferences"""
+        if exchange_pref == 'bybit':
+            df = self.collector.get_bybit_klines(symbol, "1m", limit=1)
+        elif market_pref == 'futures':
+            df = self.collector._get_binance_futures_klines(symbol, "1m", limit=1)
+        elif market_pref == 'spot':
+            df = self.collector.get_binance_klines(symbol, "1m", limit=1,
+                                                   use_cache=False, save_cache=False)
+        else:  # auto
+            df = self.collector.get_binance_klines_auto(symbol, "1m", limit=1)
+
+        if df is None or len(df) == 0:
+            return None
+        return df['close'].iloc[-1]
+
+    async def _fetch_prices(self, keys: List[tuple]) -> Dict[tuple, Any]:
+        """Fetch (symbol, exchange, market) prices on the bounded alert pool"""
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(_PRICE_POOL, self._fetch_price, *key) for key in keys),
+            return_exceptions=True
+        )
+        return dict(zip(keys, results))
 
     def format_alert_message(self, symbol: str, alert_type: str,
                            target_price: float, current_price: float) -> str:
@@ -67,17 +96,15 @@ class AlertWorker:
             logger.info("Starting alert check cycle...")
 
             # Get all active alerts from database
-            import sqlite3
-            conn = sqlite3.connect(db.db_path)
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, chat_id, symbol, alert_type, target_price
-                FROM alerts
-                WHERE triggered = 0
-                ORDER BY created_at ASC
-            """)
-            alerts = cursor.fetchall()
-            conn.close()
+            with db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT id, chat_id, symbol, alert_type, target_price
+                    FROM alerts
+                    WHERE triggered = 0
+                    ORDER BY created_at ASC
+                """)
+                alerts = cursor.fetchall()
 
             if not alerts:
                 logger.info("No active alerts found")
@@ -85,33 +112,32 @@ class AlertWorker:
 
             logger.info(f"Checking {len(alerts)} active alerts")
 
+            # Load every alerting user's preferences in one query
+            prefs_map = db.get_preferences_bulk({alert[1] for alert in alerts},
+                                                ('market_type', 'exchange'))
+
+            # Price source for each alert, per its user's preferences
+            alert_keys = []
+            for _, chat_id, symbol, _, _ in alerts:
+                prefs = prefs_map.get(chat_id, {})
+                alert_keys.append((symbol, prefs.get('exchange', 'binance'),
+                                   prefs.get('market_type', 'auto')))
+
+            # Fetch each unique price once for the whole cycle
+            prices = await self._fetch_prices(list(set(alert_keys)))
+
             triggered_count = 0
 
-            for alert_id, chat_id, symbol, alert_type, target_price in alerts:
+            for (alert_id, chat_id, symbol, alert_type, target_price), key in zip(alerts, alert_keys):
                 try:
-                    # Get user preferences for this alert
-                    market_pref = db.get_user_preference(chat_id, 'market_type', default='auto')
-                    exchange_pref = db.get_user_preference(chat_id, 'exchange', default='binance')
-
-                    # Fetch current price based on user preferences
-                    df = None
-                    if exchange_pref == 'bybit':
-                        df = self.collector.get_bybit_klines(symbol, "1m", limit=1)
-                    else:  # binance
-                        if market_pref == 'futures':
-                            df = self.collector._get_binance_futures_klines(symbol, "1m", limit=1)
-                        elif market_pref == 'spot':
-                            df = self.collector.get_binance_klines(symbol, "1m", limit=1,
-                                                                   use_cache=False, save_cache=False)
-                        else:  # auto
-                            df = self.collector.get_binance_klines_auto(symbol, "1m", limit=1)
-
-                    if df is None or len(df) == 0:
+                    current_price = prices[key]
+                    if isinstance(current_price, Exception):
+                        raise current_price
+
+                    if current_price is None:
                         logger.warning(f"Could not fetch price for {symbol} (alert_id: {alert_id})")
                         continue
 
-                    current_price = df.iloc[-1]['close']
-
                     # Check if alert is triggered
                     triggered = False
                     if alert_type == 'above' and current_price >= target_price:
@@ -125,28 +151,19 @@ class AlertWorker:
                             symbol, alert_type, target_price, current_price
                         )
 
-                        await self.bot.send_message(
-                            chat_id=chat_id,
-                            text=message,
-                            parse_mode='Markdown'
-                        )
+                        await send_message(self.bot, chat_id, message, parse_mode='Markdown')
 
                         # Mark alert as triggered in database
-                        conn = sqlite3.connect(db.db_path)
-                        cursor = conn.cursor()
-                        cursor.execute("""
-                            UPDATE alerts
-                            SET triggered = 1
-                            WHERE id = ?
-                        """, (alert_id,))
-                        conn.commit()
-                        conn.close()
+                        with db.connection() as conn:
+                            cursor = conn.cursor()
+                            cursor.execute("""
+                                UPDATE alerts
+                                SET triggered = 1
+                                WHERE id = ?
+                            """, (alert_id,))
 
                         triggered_count += 1
                         logger.info(f"Alert #{alert_id} triggered: {symbol} {alert_type} ${target_price:,.2f}")
-
-                        # Small delay to avoid rate limiting
-                        await asyncio.sleep(0.5)
                     else:
                         logger.debug(f"Alert #{alert_id} not triggered: {symbol} @ ${current_price:,.2f}")
 
@@ -168,6 +185,16 @@ class AlertWorker:
             if not alerts:
                 return 0
 
+            # Get user preferences once for all alerts
+            prefs = db.get_user_preferences(chat_id, ('market_type', 'exchange'))
+            market_pref = prefs.get('market_type', 'auto')
+            exchange_pref = prefs.get('exchange', 'binance')
+
+            # Fetch each alerted symbol's price once
+            prices = await self._fetch_prices(
+                list({(alert['symbol'], exchange_pref, market_pref) for alert in alerts})
+            )
+
             triggered_count = 0
 
             for alert in alerts:
@@ -177,29 +204,14 @@ class AlertWorker:
                     alert_type = alert['alert_type']
                     target_price = alert['target_price']
 
-                    # Get user preferences
-                    market_pref = db.get_user_preference(chat_id, 'market_type', default='auto')
-                    exchange_pref = db.get_user_preference(chat_id, 'exchange', default='binance')
-
-                    # Fetch current price
-                    df = None
-                    if exchange_pref == 'bybit':
-                        df = self.collector.get_bybit_klines(symbol, "1m", limit=1)
-                    else:  # binance
-                        if market_pref == 'futures':
-                            df = self.collector._get_binance_futures_klines(symbol, "1m", limit=1)
-                        elif market_pref == 'spot':
-                            df = self.collector.get_binance_klines(symbol, "1m", limit=1,
-                                                                   use_cache=False, save_cache=False)
-                        else:  # auto
-                            df = self.collector.get_binance_klines_auto(symbol, "1m", limit=1)
-
-                    if df is None or len(df) == 0:
+                    current_price = prices[(symbol, exchange_pref, market_pref)]
+                    if isinstance(current_price, Exception):
+                        raise current_price
+
+                    if current_price is None:
                         logger.warning(f"Could not fetch price for {symbol}")
                         continue
 
-                    current_price = df.iloc[-1]['close']
-
                     # Check if triggered
                     triggered = False
                     if alert_type == 'above' and current_price >= target_price:
@@ -213,11 +225,7 @@ class AlertWorker:
                             symbol, alert_type, target_price, current_price
                         )
 
-                        await self.bot.send_message(
-                            chat_id=chat_id,
-                            text=message,
-                            parse_mode='Markdown'
-                        )
+                        await send_message(self.bot, chat_id, message, parse_mode='Markdown')
 
                         # Mark as triggered
                         db.delete_alert(alert_id, chat_id)  # Or use a method to mark as triggered
@@ -225,8 +233,6 @@ class AlertWorker:
                         triggered_count += 1
                         logger.info(f"Alert triggered for {chat_id}: {symbol} {alert_type} ${target_price}")
 
-                        await asyncio.sleep(0.5)
-
                 except Exception as e:
                     logger.error(f"Error processing alert for {chat_id}: {e}")
                     continue
@@ -5,6 +5,8 @@ Main bot class with command registration
 
 import logging
 import asyncio
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler
 from telegram.ext import filters
@@ -12,6 +14,7 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from config import config
 from tg_bot.database import db
+from tg_bot.cache import TTLCache
 from tg_bot import handlers
 from tg_bot.signal_worker import get_signal_worker
 from tg_bot.alert_worker import get_alert_worker
@@ -76,6 +79,25 @@ class TelegramTradingBot:
         """Post-initialization callback"""
         logger.info("Bot application initialized")
 
+        # Larger default executor for blocking collector calls offloaded by handlers
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=32, thread_name_prefix="collector")
+        )
+
+        # Shared HTTP session for async handlers (reused across commands)
+        application.bot_data['http_session'] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=200,
+                limit_per_host=30,
+                ttl_dns_cache=300,
+                keepalive_timeout=90
+            ),
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+
+        # Generated plans kept for the "Add to Portfolio" callback (5 minutes)
+        application.bot_data['trading_plans'] = TTLCache(maxsize=10_000, ttl=300)
+
         # Setup signal check scheduler
         self.setup_signal_scheduler()
 
@@ -129,6 +151,11 @@ class TelegramTradingBot:
 
     async def post_shutdown(self, application: Application) -> None:
         """Post-shutdown callback"""
+        session = application.bot_data.pop('http_session', None)
+        if session is not None:
+            await session.close()
+
+        db.close_connections()
         logger.info("Bot application shutdown")
 
     async def error_handler(self, update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
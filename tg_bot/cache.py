@@ -0,0 +1,75 @@
+"""
+Bot Cache
+Small in-process TTL cache shared by command handlers
+"""
+
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire after a time-to-live (seconds)"""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._expiry = []  # heap of (expires_at, seq, key); stale rows skipped on purge
+        self._seq = itertools.count()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value if present and not expired"""
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting expired and then oldest entries if full"""
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._data.pop(key, None)
+        self._data[key] = (expires_at, value)
+        heapq.heappush(self._expiry, (expires_at, next(self._seq), key))
+        self._purge(now)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return a value if present and not expired"""
+        value = self.get(key, default)
+        self._data.pop(key, None)
+        return value
+
+    def _purge(self, now: float):
+        """Drop expired entries in expiry order, then enforce maxsize"""
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            expires_at, _, key = heapq.heappop(expiry)
+            item = self._data.get(key)
+            # Skip rows for keys since overwritten, popped or evicted
+            if item is not None and item[0] == expires_at:
+                del self._data[key]
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+        # Rebuild once stale rows outnumber live entries
+        if len(expiry) > 2 * max(len(self._data), self.maxsize):
+            self._expiry = [row for row in expiry
+                            if self._data.get(row[2], (None,))[0] == row[0]]
+            heapq.heapify(self._expiry)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -5,7 +5,9 @@ SQLite database for user management, subscriptions, and alerts
 
 import sqlite3
 import logging
-from typing import List, Dict, Optional, Any
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Iterator, Optional, Any, Sequence
 from datetime import datetime
 from pathlib import Path
 
@@ -13,6 +15,7 @@ from config import config
 
 logger = logging.getLogger(__name__)
 
+
 class TelegramDatabase:
     """SQLite database for Telegram bot"""
 
@@ -24,13 +27,54 @@ class TelegramDatabase:
 
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []  # every thread's connection, for shutdown
+        self._connections_lock = threading.Lock()
 
         self._init_database()
         logger.info(f"Telegram database initialized: {self.db_path}")
 
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get this thread's cached connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Only the owning thread uses it; check_same_thread is off so
+            # close_connections() can close it from the shutdown thread
+            conn = sqlite3.connect(self.db_path, cached_statements=256, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Use this thread's cached connection, committing on success and rolling back on error"""
+        conn = self._get_connection()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def close_connections(self):
+        """Close every thread's cached connection (call at shutdown)"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error closing database connection: {e}")
+
     def _init_database(self):
         """Create tables if not exist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
 
         # Users table
@@ -124,33 +168,49 @@ class TelegramDatabase:
             )
         """)
 
+        # Last signal sent per subscription (survives restarts)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS last_signals (
+                chat_id INTEGER,
+                symbol TEXT,
+                signal TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (chat_id, symbol)
+            )
+        """)
+
         # Create indexes
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_subscriptions_chat_id ON subscriptions(chat_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_alerts_chat_id ON alerts(chat_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_alerts_triggered ON alerts(triggered)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_preferences_chat_id ON user_preferences(chat_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_positions_chat_id ON portfolio_positions(chat_id)")
+        # idx_positions_chat_status_opened below covers chat_id lookups
+        cursor.execute("DROP INDEX IF EXISTS idx_positions_chat_id")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_positions_status ON portfolio_positions(status)")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_positions_chat_status_opened
+            ON portfolio_positions(chat_id, status, opened_at DESC)
+        """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_chat_id ON portfolio_transactions(chat_id)")
 
         conn.commit()
-        conn.close()
+
+        # Refresh planner statistics so queries pick up the indexes above
+        cursor.execute("PRAGMA optimize")
 
     # ============ USER MANAGEMENT ============
     def add_user(self, chat_id: int, username: str = None, first_name: str = None,
                  last_name: str = None, role: str = "user") -> bool:
         """Add new user"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                INSERT OR REPLACE INTO users (chat_id, username, first_name, last_name, role, last_active)
-                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (chat_id, username, first_name, last_name, role))
+                cursor.execute("""
+                    INSERT OR REPLACE INTO users (chat_id, username, first_name, last_name, role, last_active)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, (chat_id, username, first_name, last_name, role))
 
-            conn.commit()
-            conn.close()
             logger.info(f"User added/updated: {chat_id} (@{username})")
             return True
         except Exception as e:
@@ -160,16 +220,15 @@ class TelegramDatabase:
     def get_user(self, chat_id: int) -> Optional[Dict]:
         """Get user by chat_id"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                SELECT chat_id, username, first_name, last_name, role, enabled, created_at, last_active
-                FROM users WHERE chat_id = ?
-            """, (chat_id,))
+                cursor.execute("""
+                    SELECT chat_id, username, first_name, last_name, role, enabled, created_at, last_active
+                    FROM users WHERE chat_id = ?
+                """, (chat_id,))
 
-            row = cursor.fetchone()
-            conn.close()
+                row = cursor.fetchone()
 
             if row:
                 return {
@@ -190,37 +249,33 @@ class TelegramDatabase:
     def update_last_active(self, chat_id: int):
         """Update user last active timestamp"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                UPDATE users SET last_active = CURRENT_TIMESTAMP WHERE chat_id = ?
-            """, (chat_id,))
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            conn.commit()
-            conn.close()
+                cursor.execute("""
+                    UPDATE users SET last_active = CURRENT_TIMESTAMP WHERE chat_id = ?
+                """, (chat_id,))
         except Exception as e:
             logger.error(f"Error updating last active: {e}")
 
     def get_all_users(self, enabled_only: bool = True) -> List[Dict]:
         """Get all users"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            if enabled_only:
-                cursor.execute("""
-                    SELECT chat_id, username, first_name, last_name, role, enabled, created_at, last_active
-                    FROM users WHERE enabled = 1
-                """)
-            else:
-                cursor.execute("""
-                    SELECT chat_id, username, first_name, last_name, role, enabled, created_at, last_active
-                    FROM users
-                """)
+                if enabled_only:
+                    cursor.execute("""
+                        SELECT chat_id, username, first_name, last_name, role, enabled, created_at, last_active
+                        FROM users WHERE enabled = 1
+                    """)
+                else:
+                    cursor.execute("""
+                        SELECT chat_id, username, first_name, last_name, role, enabled, created_at, last_active
+                        FROM users
+                    """)
 
-            rows = cursor.fetchall()
-            conn.close()
+                rows = cursor.fetchall()
 
             users = []
             for row in rows:
@@ -251,13 +306,11 @@ class TelegramDatabase:
     def enable_user(self, chat_id: int, enabled: bool = True) -> bool:
         """Enable/disable user"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("UPDATE users SET enabled = ? WHERE chat_id = ?", (int(enabled), chat_id))
+                cursor.execute("UPDATE users SET enabled = ? WHERE chat_id = ?", (int(enabled), chat_id))
 
-            conn.commit()
-            conn.close()
             logger.info(f"User {chat_id} {'enabled' if enabled else 'disabled'}")
             return True
         except Exception as e:
@@ -268,16 +321,14 @@ class TelegramDatabase:
     def add_subscription(self, chat_id: int, symbol: str, timeframe: str = "4h") -> bool:
         """Add subscription"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                INSERT OR IGNORE INTO subscriptions (chat_id, symbol, timeframe)
-                VALUES (?, ?, ?)
-            """, (chat_id, symbol.upper(), timeframe))
+                cursor.execute("""
+                    INSERT OR IGNORE INTO subscriptions (chat_id, symbol, timeframe)
+                    VALUES (?, ?, ?)
+                """, (chat_id, symbol.upper(), timeframe))
 
-            conn.commit()
-            conn.close()
             logger.info(f"Subscription added: {chat_id} -> {symbol}")
             return True
         except Exception as e:
@@ -287,15 +338,16 @@ class TelegramDatabase:
     def remove_subscription(self, chat_id: int, symbol: str) -> bool:
         """Remove subscription"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                DELETE FROM subscriptions WHERE chat_id = ? AND symbol = ?
-            """, (chat_id, symbol.upper()))
+                cursor.execute("""
+                    DELETE FROM subscriptions WHERE chat_id = ? AND symbol = ?
+                """, (chat_id, symbol.upper()))
+                cursor.execute("""
+                    DELETE FROM last_signals WHERE chat_id = ? AND symbol = ?
+                """, (chat_id, symbol.upper()))
 
-            conn.commit()
-            conn.close()
             logger.info(f"Subscription removed: {chat_id} -> {symbol}")
             return True
         except Exception as e:
@@ -305,17 +357,16 @@ class TelegramDatabase:
     def get_user_subscriptions(self, chat_id: int) -> List[Dict]:
         """Get user subscriptions"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                SELECT id, symbol, timeframe, created_at
-                FROM subscriptions WHERE chat_id = ?
-                ORDER BY symbol
-            """, (chat_id,))
+                cursor.execute("""
+                    SELECT id, symbol, timeframe, created_at
+                    FROM subscriptions WHERE chat_id = ?
+                    ORDER BY symbol
+                """, (chat_id,))
 
-            rows = cursor.fetchall()
-            conn.close()
+                rows = cursor.fetchall()
 
             subscriptions = []
             for row in rows:
@@ -331,43 +382,124 @@ class TelegramDatabase:
             logger.error(f"Error getting subscriptions: {e}")
             return []
 
+    def count_user_subscriptions(self, chat_id: int) -> int:
+        """Count user subscriptions"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("SELECT COUNT(*) FROM subscriptions WHERE chat_id = ?", (chat_id,))
+                count = cursor.fetchone()[0]
+
+            return count
+        except Exception as e:
+            logger.error(f"Error counting subscriptions: {e}")
+            return 0
+
     def get_subscribers_for_symbol(self, symbol: str) -> List[int]:
         """Get all chat_ids subscribed to a symbol"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                SELECT DISTINCT u.chat_id
-                FROM users u
-                JOIN subscriptions s ON u.chat_id = s.chat_id
-                WHERE u.enabled = 1 AND s.symbol = ?
-            """, (symbol.upper(),))
+                cursor.execute("""
+                    SELECT DISTINCT u.chat_id
+                    FROM users u
+                    JOIN subscriptions s ON u.chat_id = s.chat_id
+                    WHERE u.enabled = 1 AND s.symbol = ?
+                """, (symbol.upper(),))
 
-            rows = cursor.fetchall()
-            conn.close()
+                rows = cursor.fetchall()
 
             return [row[0] for row in rows]
         except Exception as e:
             logger.error(f"Error getting subscribers: {e}")
             return []
 
+    def get_subscriptions_with_preferences(self) -> List[Dict]:
+        """Get all subscriptions with each user's market/exchange preference, ordered by chat_id"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("""
+                    SELECT s.chat_id, s.symbol,
+                           COALESCE(pm.preference_value, 'auto'),
+                           COALESCE(pe.preference_value, 'binance')
+                    FROM subscriptions s
+                    LEFT JOIN user_preferences pm
+                        ON pm.chat_id = s.chat_id AND pm.preference_key = 'market_type'
+                    LEFT JOIN user_preferences pe
+                        ON pe.chat_id = s.chat_id AND pe.preference_key = 'exchange'
+                    ORDER BY s.chat_id, s.symbol
+                """)
+
+                rows = cursor.fetchall()
+
+            return [
+                {'chat_id': row[0], 'symbol': row[1], 'market_type': row[2], 'exchange': row[3]}
+                for row in rows
+            ]
+        except Exception as e:
+            logger.error(f"Error getting subscriptions with preferences: {e}")
+            return []
+
+    # ============ LAST SIGNALS ============
+    def get_last_signals(self) -> Optional[Dict[int, Dict[str, str]]]:
+        """Get the last signal sent for every active subscription, keyed by chat_id then symbol
+
+        Returns None on error, so callers can tell a failure from "nothing sent yet".
+        """
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("""
+                    SELECT l.chat_id, l.symbol, l.signal
+                    FROM last_signals l
+                    JOIN subscriptions s ON s.chat_id = l.chat_id AND s.symbol = l.symbol
+                """)
+
+                rows = cursor.fetchall()
+
+            last_signals: Dict[int, Dict[str, str]] = {}
+            for chat_id, symbol, signal in rows:
+                last_signals.setdefault(chat_id, {})[symbol] = signal
+            return last_signals
+        except Exception as e:
+            logger.error(f"Error getting last signals: {e}")
+            return None
+
+    def set_last_signals(self, signals: Sequence[tuple]) -> bool:
+        """Record (chat_id, symbol, signal) rows in one transaction"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO last_signals (chat_id, symbol, signal, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """, signals)
+
+            return True
+        except Exception as e:
+            logger.error(f"Error setting last signals: {e}")
+            return False
+
     # ============ ALERTS ============
     def add_alert(self, chat_id: int, symbol: str, alert_type: str,
                   target_price: float) -> Optional[int]:
         """Add price alert"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                INSERT INTO alerts (chat_id, symbol, alert_type, target_price)
-                VALUES (?, ?, ?, ?)
-            """, (chat_id, symbol.upper(), alert_type, target_price))
+                cursor.execute("""
+                    INSERT INTO alerts (chat_id, symbol, alert_type, target_price)
+                    VALUES (?, ?, ?, ?)
+                """, (chat_id, symbol.upper(), alert_type, target_price))
 
-            conn.commit()
-            alert_id = cursor.lastrowid
-            conn.close()
+                alert_id = cursor.lastrowid
 
             logger.info(f"Alert added: {alert_id} - {symbol} {alert_type} {target_price}")
             return alert_id
@@ -378,24 +510,23 @@ class TelegramDatabase:
     def get_user_alerts(self, chat_id: int, active_only: bool = True) -> List[Dict]:
         """Get user alerts"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            if active_only:
-                cursor.execute("""
-                    SELECT id, symbol, alert_type, target_price, created_at
-                    FROM alerts WHERE chat_id = ? AND triggered = 0
-                    ORDER BY created_at DESC
-                """, (chat_id,))
-            else:
-                cursor.execute("""
-                    SELECT id, symbol, alert_type, target_price, triggered, created_at
-                    FROM alerts WHERE chat_id = ?
-                    ORDER BY created_at DESC
-                """, (chat_id,))
+                if active_only:
+                    cursor.execute("""
+                        SELECT id, symbol, alert_type, target_price, created_at
+                        FROM alerts WHERE chat_id = ? AND triggered = 0
+                        ORDER BY created_at DESC
+                    """, (chat_id,))
+                else:
+                    cursor.execute("""
+                        SELECT id, symbol, alert_type, target_price, triggered, created_at
+                        FROM alerts WHERE chat_id = ?
+                        ORDER BY created_at DESC
+                    """, (chat_id,))
 
-            rows = cursor.fetchall()
-            conn.close()
+                rows = cursor.fetchall()
 
             alerts = []
             for row in rows:
@@ -415,13 +546,11 @@ class TelegramDatabase:
     def trigger_alert(self, alert_id: int) -> bool:
         """Mark alert as triggered"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("UPDATE alerts SET triggered = 1 WHERE id = ?", (alert_id,))
+                cursor.execute("UPDATE alerts SET triggered = 1 WHERE id = ?", (alert_id,))
 
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             logger.error(f"Error triggering alert: {e}")
@@ -430,16 +559,14 @@ class TelegramDatabase:
     def delete_alert(self, alert_id: int, chat_id: int = None) -> bool:
         """Delete alert"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            if chat_id:
-                cursor.execute("DELETE FROM alerts WHERE id = ? AND chat_id = ?", (alert_id, chat_id))
-            else:
-                cursor.execute("DELETE FROM alerts WHERE id = ?", (alert_id,))
+                if chat_id:
+                    cursor.execute("DELETE FROM alerts WHERE id = ? AND chat_id = ?", (alert_id, chat_id))
+                else:
+                    cursor.execute("DELETE FROM alerts WHERE id = ?", (alert_id,))
 
-            conn.commit()
-            conn.close()
             logger.info(f"Alert deleted: {alert_id}")
             return True
         except Exception as e:
@@ -449,13 +576,11 @@ class TelegramDatabase:
     def clear_user_alerts(self, chat_id: int) -> bool:
         """Clear all user alerts"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("DELETE FROM alerts WHERE chat_id = ?", (chat_id,))
+                cursor.execute("DELETE FROM alerts WHERE chat_id = ?", (chat_id,))
 
-            conn.commit()
-            conn.close()
             logger.info(f"All alerts cleared for user: {chat_id}")
             return True
         except Exception as e:
@@ -466,17 +591,16 @@ class TelegramDatabase:
     def get_user_preference(self, chat_id: int, key: str, default: Any = None) -> Any:
         """Get user preference value"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                SELECT preference_value
-                FROM user_preferences
-                WHERE chat_id = ? AND preference_key = ?
-            """, (chat_id, key))
+                cursor.execute("""
+                    SELECT preference_value
+                    FROM user_preferences
+                    WHERE chat_id = ? AND preference_key = ?
+                """, (chat_id, key))
 
-            row = cursor.fetchone()
-            conn.close()
+                row = cursor.fetchone()
 
             if row:
                 return row[0]
@@ -485,19 +609,63 @@ class TelegramDatabase:
             logger.error(f"Error getting user preference: {e}")
             return default
 
+    def get_user_preferences(self, chat_id: int, keys: Sequence[str]) -> Dict[str, Any]:
+        """Get several user preference values in one query (missing keys are omitted)"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+
+                placeholders = ",".join("?" * len(keys))
+                cursor.execute(f"""
+                    SELECT preference_key, preference_value
+                    FROM user_preferences
+                    WHERE chat_id = ? AND preference_key IN ({placeholders})
+                """, (chat_id, *keys))
+
+                rows = cursor.fetchall()
+
+            return dict(rows)
+        except Exception as e:
+            logger.error(f"Error getting user preferences: {e}")
+            return {}
+
+    def get_preferences_bulk(self, chat_ids: Sequence[int], keys: Sequence[str]) -> Dict[int, Dict[str, Any]]:
+        """Get preference values for many users in one query, keyed by chat_id"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+
+                # Filter users in Python so large user lists don't hit SQLite's variable limit
+                placeholders = ",".join("?" * len(keys))
+                cursor.execute(f"""
+                    SELECT chat_id, preference_key, preference_value
+                    FROM user_preferences
+                    WHERE preference_key IN ({placeholders})
+                """, tuple(keys))
+
+                rows = cursor.fetchall()
+
+            wanted = set(chat_ids)
+            prefs: Dict[int, Dict[str, Any]] = {}
+            for chat_id, key, value in rows:
+                if chat_id in wanted:
+                    prefs.setdefault(chat_id, {})[key] = value
+            return prefs
+        except Exception as e:
+            logger.error(f"Error getting preferences in bulk: {e}")
+            return {}
+
     def set_user_preference(self, chat_id: int, key: str, value: Any) -> bool:
         """Set user preference value"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                INSERT OR REPLACE INTO user_preferences (chat_id, preference_key, preference_value, updated_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            """, (chat_id, key, str(value)))
+                cursor.execute("""
+                    INSERT OR REPLACE INTO user_preferences (chat_id, preference_key, preference_value, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """, (chat_id, key, str(value)))
 
-            conn.commit()
-            conn.close()
             logger.info(f"User preference set: {chat_id} -> {key} = {value}")
             return True
         except Exception as e:
@@ -510,22 +678,20 @@ class TelegramDatabase:
                      take_profit: float = None, notes: str = None) -> Optional[int]:
         """Add new position to portfolio"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            total_value = entry_price * quantity
+                total_value = entry_price * quantity
 
-            cursor.execute("""
-                INSERT INTO portfolio_positions
-                (chat_id, symbol, position_type, entry_price, current_price, quantity,
-                 total_value, stop_loss, take_profit, notes, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'open')
-            """, (chat_id, symbol.upper(), position_type.upper(), entry_price,
-                  entry_price, quantity, total_value, stop_loss, take_profit, notes))
+                cursor.execute("""
+                    INSERT INTO portfolio_positions
+                    (chat_id, symbol, position_type, entry_price, current_price, quantity,
+                     total_value, stop_loss, take_profit, notes, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'open')
+                """, (chat_id, symbol.upper(), position_type.upper(), entry_price,
+                      entry_price, quantity, total_value, stop_loss, take_profit, notes))
 
-            conn.commit()
-            position_id = cursor.lastrowid
-            conn.close()
+                position_id = cursor.lastrowid
 
             logger.info(f"Position added: {position_id} - {symbol} {position_type} @{entry_price}")
             return position_id
@@ -536,30 +702,29 @@ class TelegramDatabase:
     def get_user_positions(self, chat_id: int, status: str = 'open') -> List[Dict]:
         """Get user positions"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            if status:
-                cursor.execute("""
-                    SELECT id, symbol, position_type, entry_price, current_price,
-                           quantity, total_value, stop_loss, take_profit, notes,
-                           opened_at, closed_at
-                    FROM portfolio_positions
-                    WHERE chat_id = ? AND status = ?
-                    ORDER BY opened_at DESC
-                """, (chat_id, status))
-            else:
-                cursor.execute("""
-                    SELECT id, symbol, position_type, entry_price, current_price,
-                           quantity, total_value, stop_loss, take_profit, notes,
-                           opened_at, closed_at
-                    FROM portfolio_positions
-                    WHERE chat_id = ?
-                    ORDER BY opened_at DESC
-                """, (chat_id,))
+                if status:
+                    cursor.execute("""
+                        SELECT id, symbol, position_type, entry_price, current_price,
+                               quantity, total_value, stop_loss, take_profit, notes,
+                               opened_at, closed_at
+                        FROM portfolio_positions
+                        WHERE chat_id = ? AND status = ?
+                        ORDER BY opened_at DESC
+                    """, (chat_id, status))
+                else:
+                    cursor.execute("""
+                        SELECT id, symbol, position_type, entry_price, current_price,
+                               quantity, total_value, stop_loss, take_profit, notes,
+                               opened_at, closed_at
+                        FROM portfolio_positions
+                        WHERE chat_id = ?
+                        ORDER BY opened_at DESC
+                    """, (chat_id,))
 
-            rows = cursor.fetchall()
-            conn.close()
+                rows = cursor.fetchall()
 
             positions = []
             for row in rows:
@@ -586,28 +751,27 @@ class TelegramDatabase:
     def get_position(self, position_id: int, chat_id: int = None) -> Optional[Dict]:
         """Get specific position"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            if chat_id:
-                cursor.execute("""
-                    SELECT id, symbol, position_type, entry_price, current_price,
-                           quantity, total_value, stop_loss, take_profit, notes,
-                           opened_at, closed_at, status
-                    FROM portfolio_positions
-                    WHERE id = ? AND chat_id = ?
-                """, (position_id, chat_id))
-            else:
-                cursor.execute("""
-                    SELECT id, symbol, position_type, entry_price, current_price,
-                           quantity, total_value, stop_loss, take_profit, notes,
-                           opened_at, closed_at, status
-                    FROM portfolio_positions
-                    WHERE id = ?
-                """, (position_id,))
+                if chat_id:
+                    cursor.execute("""
+                        SELECT id, symbol, position_type, entry_price, current_price,
+                               quantity, total_value, stop_loss, take_profit, notes,
+                               opened_at, closed_at, status
+                        FROM portfolio_positions
+                        WHERE id = ? AND chat_id = ?
+                    """, (position_id, chat_id))
+                else:
+                    cursor.execute("""
+                        SELECT id, symbol, position_type, entry_price, current_price,
+                               quantity, total_value, stop_loss, take_profit, notes,
+                               opened_at, closed_at, status
+                        FROM portfolio_positions
+                        WHERE id = ?
+                    """, (position_id,))
 
-            row = cursor.fetchone()
-            conn.close()
+                row = cursor.fetchone()
 
             if row:
                 return {
@@ -633,70 +797,60 @@ class TelegramDatabase:
     def update_position_price(self, position_id: int, current_price: float) -> bool:
         """Update current price of position"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            # Get quantity first
-            cursor.execute("SELECT quantity FROM portfolio_positions WHERE id = ?", (position_id,))
-            row = cursor.fetchone()
-            if not row:
-                conn.close()
-                return False
+                cursor.execute("""
+                    UPDATE portfolio_positions
+                    SET current_price = ?, total_value = ? * quantity
+                    WHERE id = ?
+                """, (current_price, current_price, position_id))
+                updated = cursor.rowcount > 0
+
+            return updated
+        except Exception as e:
+            logger.error(f"Error updating position price: {e}")
+            return False
 
-            quantity = row[0]
-            total_value = current_price * quantity
+    def update_position_prices(self, prices: Dict[int, float]) -> bool:
+        """Update current price of several positions in one transaction"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                UPDATE portfolio_positions
-                SET current_price = ?, total_value = ?
-                WHERE id = ?
-            """, (current_price, total_value, position_id))
+                cursor.executemany("""
+                    UPDATE portfolio_positions
+                    SET current_price = ?, total_value = ? * quantity
+                    WHERE id = ?
+                """, [(price, price, position_id) for position_id, price in prices.items()])
 
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
-            logger.error(f"Error updating position price: {e}")
+            logger.error(f"Error updating position prices: {e}")
             return False
 
     def close_position(self, position_id: int, close_price: float = None,
                       chat_id: int = None) -> bool:
         """Close position"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            if close_price:
-                # Update current price and calculate final P/L
-                cursor.execute("""
-                    SELECT quantity FROM portfolio_positions
-                    WHERE id = ?
-                """, (position_id,))
-                row = cursor.fetchone()
-                if row:
-                    quantity = row[0]
-                    total_value = close_price * quantity
+                if close_price:
+                    # Update current price and final value in the same statement
                     cursor.execute("""
                         UPDATE portfolio_positions
-                        SET current_price = ?, total_value = ?, status = 'closed',
+                        SET current_price = ?, total_value = ? * quantity, status = 'closed',
                             closed_at = CURRENT_TIMESTAMP
                         WHERE id = ?
-                    """, (close_price, total_value, position_id))
+                    """, (close_price, close_price, position_id))
                 else:
                     cursor.execute("""
                         UPDATE portfolio_positions
                         SET status = 'closed', closed_at = CURRENT_TIMESTAMP
                         WHERE id = ?
                     """, (position_id,))
-            else:
-                cursor.execute("""
-                    UPDATE portfolio_positions
-                    SET status = 'closed', closed_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """, (position_id,))
 
-            conn.commit()
-            conn.close()
             logger.info(f"Position closed: {position_id}")
             return True
         except Exception as e:
@@ -706,17 +860,15 @@ class TelegramDatabase:
     def delete_position(self, position_id: int, chat_id: int = None) -> bool:
         """Delete position permanently"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            if chat_id:
-                cursor.execute("DELETE FROM portfolio_positions WHERE id = ? AND chat_id = ?",
-                             (position_id, chat_id))
-            else:
-                cursor.execute("DELETE FROM portfolio_positions WHERE id = ?", (position_id,))
+                if chat_id:
+                    cursor.execute("DELETE FROM portfolio_positions WHERE id = ? AND chat_id = ?",
+                                 (position_id, chat_id))
+                else:
+                    cursor.execute("DELETE FROM portfolio_positions WHERE id = ?", (position_id,))
 
-            conn.commit()
-            conn.close()
             logger.info(f"Position deleted: {position_id}")
             return True
         except Exception as e:
@@ -726,44 +878,29 @@ class TelegramDatabase:
     def get_portfolio_summary(self, chat_id: int) -> Dict:
         """Get portfolio summary stats"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            # Get all open positions
-            cursor.execute("""
-                SELECT COUNT(*), SUM(total_value)
-                FROM portfolio_positions
-                WHERE chat_id = ? AND status = 'open'
-            """, (chat_id,))
+                # Count, value and P/L of all open positions in one pass
+                cursor.execute("""
+                    SELECT COUNT(*),
+                           SUM(total_value),
+                           SUM(CASE WHEN position_type = 'LONG'
+                                    THEN current_price - entry_price
+                                    ELSE entry_price - current_price END * quantity),
+                           SUM(CASE WHEN position_type = 'LONG'
+                                    THEN current_price - entry_price
+                                    ELSE entry_price - current_price END / entry_price * 100)
+                    FROM portfolio_positions
+                    WHERE chat_id = ? AND status = 'open'
+                """, (chat_id,))
+
+                row = cursor.fetchone()
 
-            row = cursor.fetchone()
             total_positions = row[0] or 0
             total_value = row[1] or 0
-
-            # Calculate P/L for all positions
-            cursor.execute("""
-                SELECT entry_price, current_price, quantity, position_type
-                FROM portfolio_positions
-                WHERE chat_id = ? AND status = 'open'
-            """, (chat_id,))
-
-            rows = cursor.fetchall()
-            total_pnl = 0.0
-            total_pnl_percent = 0.0
-
-            for row in rows:
-                entry_price, current_price, quantity, pos_type = row
-                if pos_type == 'LONG':
-                    pnl = (current_price - entry_price) * quantity
-                    pnl_percent = ((current_price - entry_price) / entry_price) * 100
-                else:  # SHORT
-                    pnl = (entry_price - current_price) * quantity
-                    pnl_percent = ((entry_price - current_price) / entry_price) * 100
-
-                total_pnl += pnl
-                total_pnl_percent += pnl_percent
-
-            conn.close()
+            total_pnl = row[2] or 0.0
+            total_pnl_percent = row[3] or 0.0
 
             return {
                 'total_positions': total_positions,
@@ -784,21 +921,19 @@ class TelegramDatabase:
                        price: float, quantity: float, notes: str = None) -> Optional[int]:
         """Add transaction to history"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
 
-            total_value = price * quantity
+                total_value = price * quantity
 
-            cursor.execute("""
-                INSERT INTO portfolio_transactions
-                (chat_id, symbol, transaction_type, price, quantity, total_value, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (chat_id, symbol.upper(), transaction_type.upper(), price,
-                  quantity, total_value, notes))
+                cursor.execute("""
+                    INSERT INTO portfolio_transactions
+                    (chat_id, symbol, transaction_type, price, quantity, total_value, notes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (chat_id, symbol.upper(), transaction_type.upper(), price,
+                      quantity, total_value, notes))
 
-            conn.commit()
-            transaction_id = cursor.lastrowid
-            conn.close()
+                transaction_id = cursor.lastrowid
 
             logger.info(f"Transaction added: {transaction_id} - {transaction_type} {symbol}")
             return transaction_id
@@ -274,13 +274,11 @@ You don't have any active subscriptions.
 Use /subscribe [symbol] to start monitoring a coin!
 """
 
-        message = f"{TelegramFormatter.EMOJI['bell']} *Your Subscriptions*\n\n"
-
-        for sub in subscriptions:
-            message += f"{TelegramFormatter.EMOJI['chart']} *{sub['symbol']}* - {sub['timeframe']}\n"
-
-        message += f"\n*Total*: {len(subscriptions)} symbol(s)"
-        return message
+        chart = TelegramFormatter.EMOJI['chart']
+        lines = [f"{TelegramFormatter.EMOJI['bell']} *Your Subscriptions*\n\n"]
+        lines.extend(f"{chart} *{sub['symbol']}* - {sub['timeframe']}\n" for sub in subscriptions)
+        lines.append(f"\n*Total*: {len(subscriptions)} symbol(s)")
+        return "".join(lines)
 
     @staticmethod
     def alerts_list(alerts: List[Dict]) -> str:
@@ -293,14 +291,14 @@ You don't have any active alerts.
 Use /setalert [symbol] [above/below] [price] to set an alert!
 """
 
-        message = f"{TelegramFormatter.EMOJI['alert']} *Your Active Alerts*\n\n"
+        lines = [f"{TelegramFormatter.EMOJI['alert']} *Your Active Alerts*\n\n"]
 
         for alert in alerts:
             direction = "↑" if alert['alert_type'] == 'above' else "↓"
-            message += f"*{alert['id']}*. {alert['symbol']} {direction} ${alert['target_price']:,.2f}\n"
+            lines.append(f"*{alert['id']}*. {alert['symbol']} {direction} ${alert['target_price']:,.2f}\n")
 
-        message += f"\n*Total*: {len(alerts)} active alert(s)"
-        return message
+        lines.append(f"\n*Total*: {len(alerts)} active alert(s)")
+        return "".join(lines)
 
     @staticmethod
     def system_status(status: Dict) -> str:
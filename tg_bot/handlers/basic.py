@@ -7,6 +7,7 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from config import config
 from tg_bot.database import db
 from tg_bot.formatter import TelegramFormatter
 
@@ -91,8 +92,6 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /subscribe command"""
     try:
-        from config import config
-
         chat_id = update.effective_chat.id
         db.update_last_active(chat_id)
 
@@ -106,10 +105,10 @@ async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         symbol = context.args[0].upper()
 
         # Check subscription limit
-        current_subs = db.get_user_subscriptions(chat_id)
+        current_subs = db.count_user_subscriptions(chat_id)
         max_subs = config.TELEGRAM.max_subscriptions_per_user
 
-        if len(current_subs) >= max_subs:
+        if current_subs >= max_subs:
             await update.message.reply_text(
                 TelegramFormatter.error_message(
                     f"Subscription limit reached ({max_subs}). "
@@ -123,7 +122,7 @@ async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text(
                 TelegramFormatter.success_message(
                     f"Subscribed to {symbol}\n"
-                    f"({len(current_subs) + 1}/{max_subs} subscriptions)"
+                    f"({current_subs + 1}/{max_subs} subscriptions)"
                 )
             )
         else:
@@ -379,8 +378,9 @@ async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 return
 
         # Get current preferences
-        market_pref = db.get_user_preference(chat_id, 'market_type', default='auto')
-        exchange_pref = db.get_user_preference(chat_id, 'exchange', default='binance')
+        prefs = db.get_user_preferences(chat_id, ('market_type', 'exchange'))
+        market_pref = prefs.get('market_type', 'auto')
+        exchange_pref = prefs.get('exchange', 'binance')
 
         settings_text = f"""⚙️ *Your Settings*
 
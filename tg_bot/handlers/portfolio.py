@@ -10,8 +10,8 @@ from telegram.ext import ContextTypes
 
 from tg_bot.database import db
 from tg_bot.formatter import TelegramFormatter
-from collector import CryptoDataCollector
-from deepseek_integration import TradingPlanGenerator, AnalysisRequest
+from collector import get_collector
+from deepseek_integration import AnalysisRequest, get_plan_generator
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +20,7 @@ class PortfolioHandler:
     """Portfolio management commands"""
 
     def __init__(self):
-        self.collector = CryptoDataCollector()
+        self.collector = get_collector()
 
     async def my_portfolio(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show user's portfolio - /myportfolio"""
@@ -39,19 +39,25 @@ class PortfolioHandler:
                 )
                 return
 
-            # Update current prices for all positions
-            for pos in positions:
+            # Fetch current prices once per symbol
+            symbol_prices = {}
+            for symbol in {pos['symbol'] for pos in positions}:
                 try:
                     # Fetch current price from exchange
-                    if pos['symbol'].endswith('USDT'):
-                        df = self.collector.get_binance_klines_auto(
-                            pos['symbol'], "1h", limit=1
-                        )
+                    if symbol.endswith('USDT'):
+                        df = self.collector.get_binance_klines_auto(symbol, "1h", limit=1)
                         if df is not None and len(df) > 0:
-                            current_price = df['close'].iloc[-1]
-                            db.update_position_price(pos['id'], current_price)
+                            symbol_prices[symbol] = float(df['close'].iloc[-1])
                 except Exception as e:
-                    logger.warning(f"Failed to update price for {pos['symbol']}: {e}")
+                    logger.warning(f"Failed to update price for {symbol}: {e}")
+
+            # Update all positions in a single transaction
+            prices = {
+                pos['id']: symbol_prices[pos['symbol']]
+                for pos in positions if pos['symbol'] in symbol_prices
+            }
+            if prices:
+                db.update_position_prices(prices)
 
             # Refresh positions with updated prices
             positions = db.get_user_positions(chat_id, status='open')
@@ -60,17 +66,17 @@ class PortfolioHandler:
             summary = db.get_portfolio_summary(chat_id)
 
             # Format message
-            message = f"💼 *Your Portfolio*\n\n"
-
-            # Summary
             total_pnl_emoji = "📈" if summary['total_pnl'] >= 0 else "📉"
-            message += f"*Summary:*\n"
-            message += f"📊 Open Positions: {summary['total_positions']}\n"
-            message += f"💰 Total Value: ${summary['total_value']:,.2f}\n"
-            message += f"{total_pnl_emoji} Total P/L: ${summary['total_pnl']:,.2f} ({summary['total_pnl_percent']:+.2f}%)\n\n"
-
-            # Individual positions
-            message += "*Open Positions:*\n\n"
+            lines = [
+                "💼 *Your Portfolio*\n\n",
+                # Summary
+                "*Summary:*\n",
+                f"📊 Open Positions: {summary['total_positions']}\n",
+                f"💰 Total Value: ${summary['total_value']:,.2f}\n",
+                f"{total_pnl_emoji} Total P/L: ${summary['total_pnl']:,.2f} ({summary['total_pnl_percent']:+.2f}%)\n\n",
+                # Individual positions
+                "*Open Positions:*\n\n",
+            ]
 
             for pos in positions:
                 # Calculate P/L
@@ -83,24 +89,27 @@ class PortfolioHandler:
 
                 pnl_emoji = "🟢" if pnl >= 0 else "🔴"
 
-                message += f"*{pos['symbol']}* - {pos['position_type']} {pnl_emoji}\n"
-                message += f"  Entry: ${pos['entry_price']:,.4f}\n"
-                message += f"  Current: ${pos['current_price']:,.4f}\n"
-                message += f"  Quantity: {pos['quantity']:.4f}\n"
-                message += f"  Value: ${pos['total_value']:,.2f}\n"
-                message += f"  P/L: ${pnl:,.2f} ({pnl_percent:+.2f}%)\n"
+                lines.append(
+                    f"*{pos['symbol']}* - {pos['position_type']} {pnl_emoji}\n"
+                    f"  Entry: ${pos['entry_price']:,.4f}\n"
+                    f"  Current: ${pos['current_price']:,.4f}\n"
+                    f"  Quantity: {pos['quantity']:.4f}\n"
+                    f"  Value: ${pos['total_value']:,.2f}\n"
+                    f"  P/L: ${pnl:,.2f} ({pnl_percent:+.2f}%)\n"
+                )
 
                 if pos['stop_loss']:
-                    message += f"  SL: ${pos['stop_loss']:,.4f}\n"
+                    lines.append(f"  SL: ${pos['stop_loss']:,.4f}\n")
                 if pos['take_profit']:
-                    message += f"  TP: ${pos['take_profit']:,.4f}\n"
+                    lines.append(f"  TP: ${pos['take_profit']:,.4f}\n")
 
                 if pos['notes']:
-                    message += f"  📝 {pos['notes']}\n"
+                    lines.append(f"  📝 {pos['notes']}\n")
 
-                message += f"  ID: `{pos['id']}`\n\n"
+                lines.append(f"  ID: `{pos['id']}`\n\n")
 
-            message += f"Use /closeposition [id] to close a position"
+            lines.append("Use /closeposition [id] to close a position")
+            message = "".join(lines)
 
             await update.message.reply_text(message, parse_mode='Markdown')
 
@@ -411,14 +420,12 @@ class PortfolioHandler:
             plan_key = f"{message_id}_{chat_id}"
             stored_plan = None
 
-            if context.bot_data and 'trading_plans' in context.bot_data:
-                import time
-                plan_data = context.bot_data['trading_plans'].get(plan_key)
-                if plan_data:
-                    # Check if plan is still valid (5 minutes)
-                    if time.time() - plan_data['timestamp'] < 300:
-                        stored_plan = plan_data['plan']
-                        logger.info(f"Using cached trading plan for {symbol}")
+            plans = context.bot_data.get('trading_plans')
+            if plans is not None:
+                # Expired plans (older than 5 minutes) are dropped by the cache
+                stored_plan = plans.get(plan_key)
+                if stored_plan:
+                    logger.info(f"Using cached trading plan for {symbol}")
 
             # Remove the button to prevent double-clicks
             try:
@@ -498,7 +505,7 @@ class PortfolioHandler:
 
             # Regenerate trading plan to get full data
             try:
-                generator = TradingPlanGenerator()
+                generator = get_plan_generator()
                 request = AnalysisRequest(
                     symbol=symbol,
                     timeframe="4h",
@@ -506,8 +513,7 @@ class PortfolioHandler:
                     analysis_type="trading_plan"
                 )
 
-                loop = asyncio.get_event_loop()
-                plan = await loop.run_in_executor(None, generator.generate_trading_plan, request)
+                plan = await asyncio.to_thread(generator.generate_trading_plan, request)
 
                 if not plan or not plan.entries:
                     await loading_msg.edit_text(
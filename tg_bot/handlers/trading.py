@@ -6,296 +6,151 @@ Handle /plan, /price, /analyze commands
 import logging
 import asyncio
 import json
+import heapq
+from operator import itemgetter
+from typing import Callable, Dict, Optional
+from functools import partial, wraps
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import aiohttp
+import pandas as pd
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from tg_bot.database import db
 from tg_bot.formatter import TelegramFormatter
-from deepseek_integration import TradingPlanGenerator, AnalysisRequest
-from collector import CryptoDataCollector
+from tg_bot.cache import TTLCache
+from deepseek_integration import AnalysisRequest, get_plan_generator
+from collector import get_collector
 
-logger = logging.getLogger(__name__)
-
-
-async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /price command"""
-    try:
-        chat_id = update.effective_chat.id
-        db.update_last_active(chat_id)
-
-        # Get symbol from args
-        if not context.args or len(context.args) < 1:
-            await update.message.reply_text(
-                "Usage: /price [symbol]\nExample: /price BTCUSDT"
-            )
-            return
-
-        symbol = context.args[0].upper()
-
-        # Get user's preferences
-        market_pref = db.get_user_preference(chat_id, 'market_type', default='auto')
-        exchange_pref = db.get_user_preference(chat_id, 'exchange', default='binance')
-
-        # Send loading message
-        loading_msg = await update.message.reply_text(
-            TelegramFormatter.loading_message(f"Fetching {symbol} price from {exchange_pref.upper()}")
-        )
-
-        # Fetch price data using user's exchange and market preference
-        collector = CryptoDataCollector()
-        try:
-            df = None
-            ticker_24h = None
-
-            # Use selected exchange
-            if exchange_pref == 'bybit':
-                df = collector.get_bybit_klines(symbol, "1m", limit=1)
-            else:  # binance (default)
-                # Apply market preference for Binance
-                if market_pref == 'futures':
-                    df = collector._get_binance_futures_klines(symbol, "1m", limit=1)
-                elif market_pref == 'spot':
-                    df = collector.get_binance_klines(symbol, "1m", limit=1, use_cache=False, save_cache=False)
-                else:  # auto
-                    df = collector.get_binance_klines_auto(symbol, "1m", limit=1)
-
-                # Get 24h ticker data for accurate volume
-                ticker_24h = collector.get_binance_24h_ticker(symbol)
-
-            if df is not None and len(df) > 0:
-                latest = df.iloc[-1]
-
-                # Use 24h ticker data if available, otherwise fall back to kline data
-                if ticker_24h:
-                    price_data = {
-                        'price': ticker_24h['last_price'],
-                        'change_24h': ticker_24h['price_change_percent'],
-                        'volume_24h': ticker_24h['quote_volume'],  # Quote volume in USDT
-                        'high_24h': ticker_24h['high_price'],
-                        'low_24h': ticker_24h['low_price'],
-                    }
-                else:
-                    # Fallback to kline data
-                    price_data = {
-                        'price': latest['close'],
-                        'change_24h': ((latest['close'] - latest['open']) / latest['open']) * 100,
-                        'volume_24h': latest['volume'],
-                        'high_24h': latest['high'],
-                        'low_24h': latest['low'],
-                    }
-
-                # Delete loading message and send price info
-                await loading_msg.delete()
-                await update.message.reply_text(
-                    TelegramFormatter.price_info(symbol, price_data),
-                    parse_mode='Markdown'
-                )
-            else:
-                await loading_msg.delete()
-                await update.message.reply_text(
-                    TelegramFormatter.error_message(f"Failed to fetch data for {symbol} from {exchange_pref.upper()}")
-                )
-
-        except Exception as e:
-            logger.error(f"Error fetching price: {e}")
-            await loading_msg.delete()
-            await update.message.reply_text(
-                TelegramFormatter.error_message(f"Error: {str(e)}"),
-                parse_mode='Markdown'
-            )
-
-    except Exception as e:
-        logger.error(f"Error in price_command: {e}")
-        await update.message.reply_text(
-            TelegramFormatter.error_message(str(e)),
-            parse_mode='Markdown'
-        )
-
-
-async def plan_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /plan command - Generate AI trading plan"""
-    try:
-        chat_id = update.effective_chat.id
-        db.update_last_active(chat_id)
-
-        # Get symbol from args
-        if not context.args or len(context.args) < 1:
-            await update.message.reply_text(
-                "Usage: /plan [symbol] [timeframe]\n"
-                "Example: /plan BTCUSDT\n"
-                "         /plan ETHUSDT 1h"
-            )
-            return
-
-        symbol = context.args[0].upper()
-        timeframe = context.args[1] if len(context.args) > 1 else "4h"
-
-        # Send loading message
-        loading_msg = await update.message.reply_text(
-            TelegramFormatter.loading_message(f"Generating AI trading plan for {symbol}")
-        )
-
-        # Generate trading plan
-        try:
-            generator = TradingPlanGenerator()
-
-            request = AnalysisRequest(
-                symbol=symbol,
-                timeframe=timeframe,
-                data_points=100,
-                analysis_type="trading_plan"
-            )
-
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-
-            # Use auto-detect method for better compatibility
-            from collector import CryptoDataCollector
-            collector = CryptoDataCollector()
-
-            # Pre-fetch data using auto-detect to ensure it's available
-            df_test = collector.get_binance_klines_auto(symbol, timeframe, limit=100)
-
-            if df_test is None or len(df_test) < 50:
-                await loading_msg.delete()
-                await update.message.reply_text(
-                    TelegramFormatter.error_message(
-                        f"Insufficient data for {symbol}. "
-                        f"Symbol may not be available or has low liquidity."
-                    )
-                )
-                return
-
-            plan = await loop.run_in_executor(None, generator.generate_trading_plan, request)
-
-            # Delete loading message
-            await loading_msg.delete()
-
-            if plan:
-                # Store plan data in bot_data for callback handler to use
-                # Use message_id as key to store the plan temporarily (expires after 5 minutes)
-                if context.bot_data is None:
-                    context.bot_data = {}
-                if 'trading_plans' not in context.bot_data:
-                    context.bot_data['trading_plans'] = {}
-
-                # Store plan with timestamp
-                import time
-                plan_key = f"{update.effective_message.message_id}_{chat_id}"
-                context.bot_data['trading_plans'][plan_key] = {
-                    'plan': plan,
-                    'timestamp': time.time()
-                }
-
-                # Create inline keyboard with "Add to Portfolio" button
-                # Include message_id in callback data to retrieve stored plan
-                callback_data = f"add_portfolio_{plan.symbol}_{plan.trend}_{update.effective_message.message_id}"
-
-                keyboard = [[InlineKeyboardButton("➕ Add to Portfolio", callback_data=callback_data)]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-
-                # Send trading plan with inline keyboard
-                await update.message.reply_text(
-                    TelegramFormatter.trading_plan(plan),
-                    parse_mode='Markdown',
-                    reply_markup=reply_markup
-                )
-            else:
-                await update.message.reply_text(
-                    TelegramFormatter.error_message(f"Failed to generate trading plan for {symbol}")
-                )
-
-        except Exception as e:
-            logger.error(f"Error generating plan: {e}")
-            await loading_msg.delete()
-            await update.message.reply_text(
-                TelegramFormatter.error_message(f"Error: {str(e)}"),
-                parse_mode='Markdown'
-            )
-
-    except Exception as e:
-        logger.error(f"Error in plan_command: {e}")
-        await update.message.reply_text(
-            TelegramFormatter.error_message(str(e)),
-            parse_mode='Markdown'
-        )
+# Faster JSON parsing for large exchange payloads
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
+logger = logging.getLogger(__name__)
 
-async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /analyze command - Quick technical analysis"""
+# Shared collector for all trading handlers
+_collector = get_collector()
+
+# Dedicated pool for slow LLM plan generation, kept apart from data fetches
+_LLM_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="llm")
+
+# Usage replies for commands called without a symbol
+_PRICE_USAGE = "Usage: /price [symbol]\nExample: /price BTCUSDT"
+_PLAN_USAGE = (
+    "Usage: /plan [symbol] [timeframe]\n"
+    "Example: /plan BTCUSDT\n"
+    "         /plan ETHUSDT 1h"
+)
+_ANALYZE_USAGE = "Usage: /analyze [symbol]\nExample: /analyze BTCUSDT"
+_TA_USAGE = "Usage: /ta [symbol]\nExample: /ta BTCUSDT"
+
+# Label for the button attached to /plan replies
+_ADD_PORTFOLIO_LABEL = "➕ Add to Portfolio"
+
+# Kline cache shared by all handlers: (exchange, market, symbol, interval, limit) -> DataFrame
+_KLINE_TTL = {'1m': 30}  # seconds, per interval; everything else uses the cache default
+_kline_cache = TTLCache(maxsize=512, ttl=60)
+
+# 24h ticker cache: (exchange, symbol, market or None for Bybit) -> ticker dict
+_ticker_cache = TTLCache(maxsize=2048, ttl=15)
+
+# In-flight fetch locks, keyed by (id(cache), key), so concurrent misses share one request.
+# Each entry is [lock, waiters]; it is dropped once no coroutine holds or awaits the lock.
+_fetch_locks: Dict[tuple, list] = {}
+
+# Indicator frames keyed by id() of the cached kline frame they were computed from
+_indicator_cache = TTLCache(maxsize=256, ttl=60)
+
+
+# Kline fetcher per exchange/market; market preference only applies to Binance
+_FETCHERS = {
+    'bybit': _collector.get_bybit_klines,
+    'futures': _collector._get_binance_futures_klines,
+    'spot': partial(_collector.get_binance_klines, use_cache=False, save_cache=False),
+    'auto': _collector.get_binance_klines_auto,
+    # Binance spot through the collector's disk cache (used by /signals)
+    'spot_cached': _collector.get_binance_klines,
+}
+
+# Interval and candle count fetched by each command
+_COMMAND_KLINES = {
+    'price': ("1m", 1),
+    'analyze': ("4h", 100),
+    'ta': ("4h", 100),
+}
+
+
+def _select_fetcher(exchange: str, market: str) -> Callable[..., Optional[pd.DataFrame]]:
+    """Pick the collector kline method for the user's exchange/market"""
+    key = 'bybit' if exchange == 'bybit' else market
+    return _FETCHERS.get(key, _FETCHERS['auto'])
+
+
+async def _cached_fetch(cache: TTLCache, key: tuple, fetch: Callable, *args,
+                       ttl: Optional[float] = None, **kwargs):
+    """Run a blocking fetch through a TTL cache, with one in-flight request per key"""
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = (id(cache), key)
+    entry = _fetch_locks.setdefault(lock_key, [asyncio.Lock(), 0])
+    entry[1] += 1
     try:
-        chat_id = update.effective_chat.id
-        db.update_last_active(chat_id)
-
-        # Get symbol from args
-        if not context.args or len(context.args) < 1:
-            await update.message.reply_text(
-                "Usage: /analyze [symbol]\nExample: /analyze BTCUSDT"
-            )
-            return
-
-        symbol = context.args[0].upper()
-
-        # Get user's preferences
-        market_pref = db.get_user_preference(chat_id, 'market_type', default='auto')
-        exchange_pref = db.get_user_preference(chat_id, 'exchange', default='binance')
-
-        # Send loading message
-        loading_msg = await update.message.reply_text(
-            TelegramFormatter.loading_message(f"Analyzing {symbol} from {exchange_pref.upper()}")
-        )
-
-        # Fetch data and perform analysis using user's exchange and market preference
-        collector = CryptoDataCollector()
-        try:
-            df = None
-
-            # Use selected exchange
-            if exchange_pref == 'bybit':
-                df = collector.get_bybit_klines(symbol, "4h", limit=100)
-            else:  # binance (default)
-                # Apply market preference for Binance
-                if market_pref == 'futures':
-                    df = collector._get_binance_futures_klines(symbol, "4h", limit=100)
-                elif market_pref == 'spot':
-                    df = collector.get_binance_klines(symbol, "4h", limit=100, use_cache=False, save_cache=False)
-                else:  # auto
-                    df = collector.get_binance_klines_auto(symbol, "4h", limit=100)
-
-            if df is not None and len(df) > 50:
-                # Calculate indicators
-                df = collector.calculate_indicators(df)
-
-                latest = df.iloc[-1]
-                current_price = latest['close']
-
-                # Quick Trend Analysis
-                sma_20 = df['MA20'].iloc[-1]
-                sma_50 = df['MA50'].iloc[-1]
-
-                if current_price > sma_20 > sma_50:
-                    trend = "BULLISH 📈"
-                elif current_price < sma_20 < sma_50:
-                    trend = "BEARISH 📉"
-                else:
-                    trend = "NEUTRAL ⚪"
-
-                # RSI Quick Check
-                rsi = latest['RSI']
-                if rsi > 70:
-                    rsi_status = "Overbought"
-                elif rsi < 30:
-                    rsi_status = "Oversold"
-                else:
-                    rsi_status = "Neutral"
-
-                # Volume Analysis
-                volume = latest['volume']
-                volume_ma = latest['volume_MA20']
-                volume_ratio = latest['volume_ratio']
-
-                # Quick analysis message
-                analysis = f"""{TelegramFormatter.EMOJI['chart']} *Quick Analysis: {symbol}*
+        async with entry[0]:
+            # Another handler may have filled the cache while we waited
+            value = cache.get(key)
+            if value is None:
+                value = await asyncio.to_thread(fetch, *args, **kwargs)
+                if value is not None and len(value) > 0:
+                    cache.set(key, value, ttl=ttl)
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _fetch_locks[lock_key]
+
+    return value
+
+
+async def _fetch_klines(exchange: str, market: str, symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+    """Fetch klines for the user's exchange/market through the shared cache"""
+    return await _cached_fetch(
+        _kline_cache, (exchange, market, symbol, interval, limit),
+        _select_fetcher(exchange, market), symbol, interval, limit=limit,
+        ttl=_KLINE_TTL.get(interval)
+    )
+
+
+async def _fetch_ticker(exchange: str, market: str, symbol: str) -> Optional[Dict]:
+    """Fetch the 24h ticker for the user's exchange/market through the shared cache"""
+    # Bybit tickers don't depend on market, so all its users share one entry
+    if exchange == 'bybit':
+        market = None
+    return await _cached_fetch(
+        _ticker_cache, (exchange, symbol, market),
+        _collector.get_24h_ticker, symbol, exchange, market
+    )
+
+
+async def _calculate_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """Calculate indicators once per cached kline DataFrame (shared by /analyze and /ta)"""
+    cached = _indicator_cache.get(id(df))
+    if cached is not None and cached[0] is df:
+        return cached[1]
+
+    result = await asyncio.to_thread(_collector.calculate_indicators, df)
+    # Keep the source frame alive so its id() cannot be reused while cached
+    _indicator_cache.set(id(df), (df, result))
+    return result
+
+
+# Markdown response templates (rendered with str.format_map)
+_ANALYZE_TMPL = TelegramFormatter.EMOJI['chart'] + """ *Quick Analysis: {symbol}*
 
 💰 *Price*: ${current_price:,.2f}
 📊 *Trend*: {trend}
@@ -305,197 +160,19 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 *MA20*: ${sma_20:,.2f}
 *MA50*: ${sma_50:,.2f}
 
-*Data Source*: {exchange_pref.upper()} | *Market*: {market_pref.upper()}
-
-Use /ta {symbol} for detailed technical analysis! {TelegramFormatter.EMOJI['robot']}
-"""
-
-                await loading_msg.delete()
-                await update.message.reply_text(analysis, parse_mode='Markdown')
-            else:
-                await loading_msg.delete()
-                await update.message.reply_text(
-                    TelegramFormatter.error_message(
-                        f"Insufficient data for {symbol} from {exchange_pref.upper()}. "
-                        f"Need at least 50 candles, got {len(df) if df is not None else 0}."
-                    )
-                )
-
-        except Exception as e:
-            logger.error(f"Error in analysis: {e}")
-            await loading_msg.delete()
-            await update.message.reply_text(
-                TelegramFormatter.error_message(f"Error: {str(e)}"),
-                parse_mode='Markdown'
-            )
-
-    except Exception as e:
-        logger.error(f"Error in analyze_command: {e}")
-        await update.message.reply_text(
-            TelegramFormatter.error_message(str(e)),
-            parse_mode='Markdown'
-        )
-
-
-async def ta_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /ta command - Comprehensive technical analysis"""
-    try:
-        chat_id = update.effective_chat.id
-        db.update_last_active(chat_id)
-
-        # Get symbol from args
-        if not context.args or len(context.args) < 1:
-            await update.message.reply_text(
-                "Usage: /ta [symbol]\nExample: /ta BTCUSDT"
-            )
-            return
+*Data Source*: {exchange} | *Market*: {market}
 
-        symbol = context.args[0].upper()
+Use /ta {symbol} for detailed technical analysis! """ + TelegramFormatter.EMOJI['robot'] + "\n"
 
-        # Get user's preferences
-        market_pref = db.get_user_preference(chat_id, 'market_type', default='auto')
-        exchange_pref = db.get_user_preference(chat_id, 'exchange', default='binance')
-
-        # Send loading message
-        loading_msg = await update.message.reply_text(
-            TelegramFormatter.loading_message(f"Performing comprehensive analysis for {symbol}")
-        )
-
-        # Fetch data and perform analysis using user's exchange and market preference
-        collector = CryptoDataCollector()
-        try:
-            df = None
-
-            # Use selected exchange
-            if exchange_pref == 'bybit':
-                df = collector.get_bybit_klines(symbol, "4h", limit=100)
-            else:  # binance (default)
-                # Apply market preference for Binance
-                if market_pref == 'futures':
-                    df = collector._get_binance_futures_klines(symbol, "4h", limit=100)
-                elif market_pref == 'spot':
-                    df = collector.get_binance_klines(symbol, "4h", limit=100, use_cache=False, save_cache=False)
-                else:  # auto
-                    df = collector.get_binance_klines_auto(symbol, "4h", limit=100)
-
-            if df is not None and len(df) > 50:
-                # Calculate indicators
-                df = collector.calculate_indicators(df)
-
-                latest = df.iloc[-1]
-                current_price = latest['close']
-
-                # Trend Analysis
-                sma_20 = df['MA20'].iloc[-1]
-                sma_50 = df['MA50'].iloc[-1]
-                sma_7 = df['MA7'].iloc[-1]
-
-                trend = "NEUTRAL ⚪"
-                trend_strength = "Weak"
-                if current_price > sma_7 > sma_20 > sma_50:
-                    trend = "STRONG BULLISH 🚀"
-                    trend_strength = "Strong"
-                elif current_price > sma_20 > sma_50:
-                    trend = "BULLISH 📈"
-                    trend_strength = "Moderate"
-                elif current_price < sma_7 < sma_20 < sma_50:
-                    trend = "STRONG BEARISH 🔻"
-                    trend_strength = "Strong"
-                elif current_price < sma_20 < sma_50:
-                    trend = "BEARISH 📉"
-                    trend_strength = "Moderate"
-
-                # RSI Analysis
-                rsi = latest['RSI']
-                rsi_signal = "NEUTRAL"
-                if rsi > 70:
-                    rsi_signal = "OVERBOUGHT 🔴"
-                elif rsi > 60:
-                    rsi_signal = "STRONG 🟢"
-                elif rsi < 30:
-                    rsi_signal = "OVERSOLD 🟢"
-                elif rsi < 40:
-                    rsi_signal = "WEAK 🔴"
-                else:
-                    rsi_signal = "NEUTRAL ⚪"
-
-                # MACD Analysis
-                macd = latest['MACD']
-                macd_signal = latest['MACD_signal']
-                macd_hist = latest['MACD_hist']
-                macd_trend = "BULLISH" if macd_hist > 0 else "BEARISH"
-                macd_status = f"{macd_trend} {'📈' if macd_hist > 0 else '📉'}"
-
-                # Bollinger Bands
-                bb_upper = latest['BB_upper']
-                bb_lower = latest['BB_lower']
-                bb_middle = latest['BB_middle']
-                bb_position = ((current_price - bb_lower) / (bb_upper - bb_lower)) * 100
-
-                bb_signal = "MIDDLE"
-                if bb_position > 80:
-                    bb_signal = "UPPER BAND (Overbought)"
-                elif bb_position < 20:
-                    bb_signal = "LOWER BAND (Oversold)"
-
-                # Support & Resistance (using recent lows/highs)
-                recent_high = df['high'].tail(20).max()
-                recent_low = df['low'].tail(20).min()
-
-                # Volume Analysis
-                volume = latest['volume']
-                volume_ma = latest['volume_MA20']
-                volume_ratio = latest['volume_ratio']
-                volume_status = "NORMAL"
-                if volume_ratio > 2:
-                    volume_status = "HIGH 🔥"
-                elif volume_ratio < 0.5:
-                    volume_status = "LOW 📉"
-
-                # Calculate changes
-                change_1h = ((df['close'].iloc[-1] - df['close'].iloc[-2]) / df['close'].iloc[-2]) * 100 if len(df) >= 2 else 0
-                change_4h = ((df['close'].iloc[-1] - df['close'].iloc[-5]) / df['close'].iloc[-5]) * 100 if len(df) >= 5 else 0
-                change_24h = ((latest['close'] - df['close'].iloc[-24]) / df['close'].iloc[-24]) * 100 if len(df) >= 24 else 0
-
-                # Overall Signal
-                signals = []
-                if trend == "STRONG BULLISH 🚀" or trend == "BULLISH 📈":
-                    signals.append(1)
-                elif trend == "STRONG BEARISH 🔻" or trend == "BEARISH 📉":
-                    signals.append(-1)
-                else:
-                    signals.append(0)
-
-                if rsi < 30:
-                    signals.append(1)  # Oversold = bullish
-                elif rsi > 70:
-                    signals.append(-1)  # Overbought = bearish
-                else:
-                    signals.append(0)
-
-                if macd_hist > 0:
-                    signals.append(1)
-                else:
-                    signals.append(-1)
-
-                signal_sum = sum(signals)
-                if signal_sum >= 2:
-                    overall_signal = "BUY 🟢"
-                elif signal_sum <= -2:
-                    overall_signal = "SELL 🔴"
-                else:
-                    overall_signal = "HOLD 🟡"
-
-                # Format comprehensive analysis message
-                analysis = f"""{TelegramFormatter.EMOJI['chart']} *Technical Analysis: {symbol}*
+_TA_TMPL = TelegramFormatter.EMOJI['chart'] + """ *Technical Analysis: {symbol}*
 
 💰 *Price Information*
 • Current: ${current_price:,.2f}
 • 1H Change: {change_1h:+.2f}%
 • 4H Change: {change_4h:+.2f}%
 • 24H Change: {change_24h:+.2f}%
-• 24H High: ${latest['high']:,.2f}
-• 24H Low: ${latest['low']:,.2f}
+• 24H High: ${high:,.2f}
+• 24H Low: ${low:,.2f}
 
 📊 *Trend Analysis*
 • Overall: {trend}
@@ -516,177 +193,518 @@ async def ta_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • Resistance: ${recent_high:,.2f}
 • Support: ${recent_low:,.2f}
 
-*Data Source*: {exchange_pref.upper()} | *Market*: {market_pref.upper()}
-
-Use /plan {symbol} for AI trading plan! {TelegramFormatter.EMOJI['robot']}
-"""
-
-                await loading_msg.delete()
-                await update.message.reply_text(analysis, parse_mode='Markdown')
-            else:
-                await loading_msg.delete()
-                await update.message.reply_text(
-                    TelegramFormatter.error_message(
-                        f"Insufficient data for {symbol} from {exchange_pref.upper()}. "
-                        f"Need at least 50 candles, got {len(df) if df is not None else 0}."
-                    )
-                )
-
+*Data Source*: {exchange} | *Market*: {market}
+
+Use /plan {symbol} for AI trading plan! """ + TelegramFormatter.EMOJI['robot'] + "\n"
+
+
+# Last-row indicator snapshot used by /ta (column order matches the fields)
+_LAST_VALUE_COLUMNS = (
+    'close', 'high', 'low', 'volume', 'MA7', 'MA20', 'MA50', 'RSI',
+    'MACD_hist', 'BB_upper', 'BB_lower', 'volume_ratio',
+)
+_LastValues = namedtuple(
+    '_LastValues',
+    'close high low volume ma7 ma20 ma50 rsi macd_hist bb_upper bb_lower volume_ratio'
+)
+
+
+def _last_values(df: pd.DataFrame) -> _LastValues:
+    """Snapshot the latest indicator values as plain scalars"""
+    return _LastValues._make(df[col].to_numpy()[-1] for col in _LAST_VALUE_COLUMNS)
+
+
+# /ta classification codes -> display labels
+_TREND_LABELS = {
+    2: ("STRONG BULLISH 🚀", "Strong"),
+    1: ("BULLISH 📈", "Moderate"),
+    0: ("NEUTRAL ⚪", "Weak"),
+    -1: ("BEARISH 📉", "Moderate"),
+    -2: ("STRONG BEARISH 🔻", "Strong"),
+}
+_RSI_LABELS = {
+    2: "OVERBOUGHT 🔴",
+    1: "STRONG 🟢",
+    0: "NEUTRAL ⚪",
+    -1: "WEAK 🔴",
+    -2: "OVERSOLD 🟢",
+}
+_BB_LABELS = {1: "UPPER BAND (Overbought)", 0: "MIDDLE", -1: "LOWER BAND (Oversold)"}
+_VOLUME_LABELS = {1: "HIGH 🔥", 0: "NORMAL", -1: "LOW 📉"}
+_OVERALL_LABELS = {1: "BUY 🟢", 0: "HOLD 🟡", -1: "SELL 🔴"}
+
+# Moving-average ordering (signs of consecutive differences) -> trend code
+_STRONG_TREND_CODES = {(1, 1, 1): 2, (-1, -1, -1): -2}
+_TREND_CODES = {(1, 1): 1, (-1, -1): -1}
+
+
+def _sign(x) -> int:
+    """Sign of x as -1/0/1 (0 for NaN)"""
+    return int(x > 0) - int(x < 0)
+
+
+def _score_ta(price, sma_7, sma_20, sma_50, rsi, macd_hist, bb_position, volume_ratio):
+    """Classify /ta indicators into (trend, rsi, bb, volume, overall) codes"""
+    # Strong trend needs price/MA7/MA20/MA50 fully ordered, plain trend only price/MA20/MA50
+    ma_stack = (_sign(price - sma_7), _sign(sma_7 - sma_20), _sign(sma_20 - sma_50))
+    ma_core = (_sign(price - sma_20), _sign(sma_20 - sma_50))
+    trend = _STRONG_TREND_CODES.get(ma_stack, _TREND_CODES.get(ma_core, 0))
+
+    if rsi > 70:
+        rsi_code = 2
+    elif rsi > 60:
+        rsi_code = 1
+    elif rsi < 30:
+        rsi_code = -2
+    elif rsi < 40:
+        rsi_code = -1
+    else:
+        rsi_code = 0
+
+    bb = 1 if bb_position > 80 else -1 if bb_position < 20 else 0
+    volume = 1 if volume_ratio > 2 else -1 if volume_ratio < 0.5 else 0
+
+    # Trend direction + RSI extremes (contrarian) + MACD histogram
+    signal_sum = (trend > 0) - (trend < 0)
+    signal_sum += 1 if rsi < 30 else -1 if rsi > 70 else 0
+    signal_sum += 1 if macd_hist > 0 else -1
+    overall = 1 if signal_sum >= 2 else -1 if signal_sum <= -2 else 0
+
+    return trend, rsi_code, bb, volume, overall
+
+
+def handle_errors(func):
+    """Log unexpected handler errors and reply with an error message"""
+    @wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        try:
+            return await func(update, context)
         except Exception as e:
-            logger.error(f"Error in technical analysis: {e}")
-            await loading_msg.delete()
+            logger.error(f"Error in {func.__name__}: {e}")
             await update.message.reply_text(
-                TelegramFormatter.error_message(f"Error: {str(e)}"),
+                TelegramFormatter.error_message(str(e)),
                 parse_mode='Markdown'
             )
+    return wrapper
+
+
+@asynccontextmanager
+async def _loading(update: Update, action: str):
+    """Show a loading message for the duration of the block, always removing it"""
+    loading_msg = await update.message.reply_text(TelegramFormatter.loading_message(action))
+    try:
+        yield loading_msg
+    finally:
+        try:
+            await loading_msg.delete()
+        except Exception as e:
+            logger.warning(f"Could not delete loading message: {e}")
+
 
-    except Exception as e:
-        logger.error(f"Error in ta_command: {e}")
+@handle_errors
+async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /price command"""
+    chat_id = update.effective_chat.id
+    db.update_last_active(chat_id)
+
+    # Get symbol from args
+    if not context.args or len(context.args) < 1:
+        await update.message.reply_text(_PRICE_USAGE)
+        return
+
+    symbol = context.args[0].upper()
+
+    # Get user's preferences
+    prefs = db.get_user_preferences(chat_id, ('market_type', 'exchange'))
+    market_pref = prefs.get('market_type', 'auto')
+    exchange_pref = prefs.get('exchange', 'binance')
+
+    # Fetch price data using user's exchange and market preference
+    async with _loading(update, f"Fetching {symbol} price from {exchange_pref.upper()}"):
+        # True 24h stats from the ticker endpoint
+        ticker_24h = await _fetch_ticker(exchange_pref, market_pref, symbol)
+        price_data = None
+
+        if ticker_24h:
+            price_data = {
+                'price': ticker_24h['last_price'],
+                'change_24h': ticker_24h['price_change_percent'],
+                'volume_24h': ticker_24h['quote_volume'],  # Quote volume in USDT
+                'high_24h': ticker_24h['high_price'],
+                'low_24h': ticker_24h['low_price'],
+            }
+        else:
+            # Fallback to latest kline data
+            df = await _fetch_klines(exchange_pref, market_pref, symbol, *_COMMAND_KLINES['price'])
+            if df is not None and len(df) > 0:
+                latest = df.iloc[-1]
+                price_data = {
+                    'price': latest['close'],
+                    'change_24h': ((latest['close'] - latest['open']) / latest['open']) * 100,
+                    'volume_24h': latest['volume'],
+                    'high_24h': latest['high'],
+                    'low_24h': latest['low'],
+                }
+
+    if price_data:
         await update.message.reply_text(
-            TelegramFormatter.error_message(str(e)),
+            TelegramFormatter.price_info(symbol, price_data),
             parse_mode='Markdown'
         )
+    else:
+        await update.message.reply_text(
+            TelegramFormatter.error_message(f"Failed to fetch data for {symbol} from {exchange_pref.upper()}")
+        )
 
 
-async def signals_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /signals command - Get signals for subscriptions"""
-    try:
-        chat_id = update.effective_chat.id
-        db.update_last_active(chat_id)
+@handle_errors
+async def plan_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /plan command - Generate AI trading plan"""
+    chat_id = update.effective_chat.id
+    db.update_last_active(chat_id)
+
+    # Get symbol from args
+    if not context.args or len(context.args) < 1:
+        await update.message.reply_text(_PLAN_USAGE)
+        return
+
+    symbol = context.args[0].upper()
+    timeframe = context.args[1] if len(context.args) > 1 else "4h"
+
+    # Generate trading plan
+    async with _loading(update, f"Generating AI trading plan for {symbol}"):
+        generator = get_plan_generator()
+
+        request = AnalysisRequest(
+            symbol=symbol,
+            timeframe=timeframe,
+            data_points=100,
+            analysis_type="trading_plan"
+        )
 
-        # Get user subscriptions
-        subscriptions = db.get_user_subscriptions(chat_id)
+        # Run in the dedicated LLM pool to avoid blocking
+        loop = asyncio.get_running_loop()
 
-        if not subscriptions:
-            await update.message.reply_text(
-                "You don't have any subscriptions.\n"
-                "Use /subscribe [symbol] to start monitoring a coin!"
-            )
-            return
+        # Use auto-detect method for better compatibility
+        # Pre-fetch data using auto-detect to ensure it's available
+        df_test = await _fetch_klines('binance', 'auto', symbol, timeframe, 100)
 
-        # Send loading message
-        loading_msg = await update.message.reply_text(
-            TelegramFormatter.loading_message("Fetching signals")
+        plan = None
+        if df_test is not None and len(df_test) >= 50:
+            # Reuse the frame only where the generator would fetch the same
+            # Binance auto data itself; other symbols go to its Bybit path
+            df_plan = df_test if symbol.endswith('USDT') else None
+            plan = await loop.run_in_executor(_LLM_POOL, generator.generate_trading_plan, request, df_plan)
+
+    if df_test is None or len(df_test) < 50:
+        await update.message.reply_text(
+            TelegramFormatter.error_message(
+                f"Insufficient data for {symbol}. "
+                f"Symbol may not be available or has low liquidity."
+            )
         )
+        return
 
-        # Fetch signals for each subscription
-        signals_text = f"{TelegramFormatter.EMOJI['chart']} *Your Trading Signals*\n\n"
+    if plan:
+        # Store plan data in bot_data for callback handler to use
+        # Use message_id as key to store the plan temporarily (expires after 5 minutes)
+        plan_key = f"{update.effective_message.message_id}_{chat_id}"
+        context.bot_data['trading_plans'].set(plan_key, plan)
 
-        collector = CryptoDataCollector()
+        # Create inline keyboard with "Add to Portfolio" button
+        # Include message_id in callback data to retrieve stored plan
+        callback_data = f"add_portfolio_{plan.symbol}_{plan.trend}_{update.effective_message.message_id}"
 
-        for sub in subscriptions[:5]:  # Limit to 5 subscriptions
-            try:
-                symbol = sub['symbol']
-                df = collector.get_binance_klines(symbol, "4h", limit=50)
+        reply_markup = InlineKeyboardMarkup.from_button(
+            InlineKeyboardButton(_ADD_PORTFOLIO_LABEL, callback_data=callback_data)
+        )
 
-                if df is not None and len(df) > 0:
-                    latest = df.iloc[-1]
-                    current_price = latest['close']
+        # Send trading plan with inline keyboard
+        await update.message.reply_text(
+            TelegramFormatter.trading_plan(plan),
+            parse_mode='Markdown',
+            reply_markup=reply_markup
+        )
+    else:
+        await update.message.reply_text(
+            TelegramFormatter.error_message(f"Failed to generate trading plan for {symbol}")
+        )
 
-                    # Simple signal logic
-                    sma_20 = df['close'].rolling(20).mean().iloc[-1]
 
-                    if current_price > sma_20:
-                        signal = "BUY 🟢"
-                    elif current_price < sma_20:
-                        signal = "SELL 🔴"
-                    else:
-                        signal = "HOLD 🟡"
+@handle_errors
+async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /analyze command - Quick technical analysis"""
+    chat_id = update.effective_chat.id
+    db.update_last_active(chat_id)
+
+    # Get symbol from args
+    if not context.args or len(context.args) < 1:
+        await update.message.reply_text(_ANALYZE_USAGE)
+        return
 
-                    signals_text += f"*{symbol}*: {signal} (${current_price:,.2f})\n"
+    symbol = context.args[0].upper()
 
-            except Exception as e:
-                logger.error(f"Error fetching signal for {sub['symbol']}: {e}")
-                continue
+    # Get user's preferences
+    prefs = db.get_user_preferences(chat_id, ('market_type', 'exchange'))
+    market_pref = prefs.get('market_type', 'auto')
+    exchange_pref = prefs.get('exchange', 'binance')
 
-        await loading_msg.delete()
-        await update.message.reply_text(signals_text, parse_mode='Markdown')
+    # Fetch data and perform analysis using user's exchange and market preference
+    async with _loading(update, f"Analyzing {symbol} from {exchange_pref.upper()}"):
+        df = await _fetch_klines(exchange_pref, market_pref, symbol, *_COMMAND_KLINES['analyze'])
+        if df is not None and len(df) > 50:
+            # Calculate indicators
+            df = await _calculate_indicators(df)
 
-    except Exception as e:
-        logger.error(f"Error in signals_command: {e}")
+    if df is None or len(df) <= 50:
         await update.message.reply_text(
-            TelegramFormatter.error_message(str(e)),
-            parse_mode='Markdown'
+            TelegramFormatter.error_message(
+                f"Insufficient data for {symbol} from {exchange_pref.upper()}. "
+                f"Need at least 50 candles, got {len(df) if df is not None else 0}."
+            )
         )
+        return
+
+    lv = _last_values(df)
+    current_price = lv.close
+
+    # Quick Trend Analysis
+    sma_20 = lv.ma20
+    sma_50 = lv.ma50
+
+    if current_price > sma_20 > sma_50:
+        trend = "BULLISH 📈"
+    elif current_price < sma_20 < sma_50:
+        trend = "BEARISH 📉"
+    else:
+        trend = "NEUTRAL ⚪"
+
+    # RSI Quick Check
+    rsi = lv.rsi
+    if rsi > 70:
+        rsi_status = "Overbought"
+    elif rsi < 30:
+        rsi_status = "Oversold"
+    else:
+        rsi_status = "Neutral"
+
+    # Volume Analysis
+    volume = lv.volume
+    volume_ratio = lv.volume_ratio
+
+    # Quick analysis message
+    analysis = _ANALYZE_TMPL.format_map({
+        'symbol': symbol,
+        'current_price': current_price,
+        'trend': trend,
+        'rsi': rsi,
+        'rsi_status': rsi_status,
+        'volume': volume,
+        'volume_ratio': volume_ratio,
+        'sma_20': sma_20,
+        'sma_50': sma_50,
+        'exchange': exchange_pref.upper(),
+        'market': market_pref.upper(),
+    })
+
+    await update.message.reply_text(analysis, parse_mode='Markdown')
+
+
+@handle_errors
+async def ta_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /ta command - Comprehensive technical analysis"""
+    chat_id = update.effective_chat.id
+    db.update_last_active(chat_id)
 
+    # Get symbol from args
+    if not context.args or len(context.args) < 1:
+        await update.message.reply_text(_TA_USAGE)
+        return
 
-async def subscribeall_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /subscribeall command - Subscribe to all major pairs"""
-    try:
-        chat_id = update.effective_chat.id
-        db.update_last_active(chat_id)
+    symbol = context.args[0].upper()
 
-        # Major pairs
-        symbols = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT"]
+    # Get user's preferences
+    prefs = db.get_user_preferences(chat_id, ('market_type', 'exchange'))
+    market_pref = prefs.get('market_type', 'auto')
+    exchange_pref = prefs.get('exchange', 'binance')
 
-        added = 0
-        for symbol in symbols:
-            if db.add_subscription(chat_id, symbol):
-                added += 1
+    # Fetch data and perform analysis using user's exchange and market preference
+    async with _loading(update, f"Performing comprehensive analysis for {symbol}"):
+        df = await _fetch_klines(exchange_pref, market_pref, symbol, *_COMMAND_KLINES['ta'])
+        if df is not None and len(df) > 50:
+            # Calculate indicators
+            df = await _calculate_indicators(df)
 
+    if df is None or len(df) <= 50:
         await update.message.reply_text(
-            TelegramFormatter.success_message(f"Subscribed to {added} major pairs")
+            TelegramFormatter.error_message(
+                f"Insufficient data for {symbol} from {exchange_pref.upper()}. "
+                f"Need at least 50 candles, got {len(df) if df is not None else 0}."
+            )
         )
+        return
+
+    # Latest indicator values, extracted once
+    lv = _last_values(df)
+    current_price = lv.close
+
+    # MACD
+    macd_trend = "BULLISH" if lv.macd_hist > 0 else "BEARISH"
+    macd_status = f"{macd_trend} {'📈' if lv.macd_hist > 0 else '📉'}"
+
+    # Bollinger Bands
+    bb_position = ((current_price - lv.bb_lower) / (lv.bb_upper - lv.bb_lower)) * 100
+
+    # Support & Resistance (using recent lows/highs)
+    recent_high = df['high'].to_numpy()[-20:].max()
+    recent_low = df['low'].to_numpy()[-20:].min()
+
+    # Calculate changes (len(df) > 50 guarantees all three lookbacks exist)
+    closes = df['close'].to_numpy()
+    change_1h, change_4h, change_24h = (closes[-1] / closes[[-2, -5, -24]] - 1) * 100
+
+    # Classify trend/RSI/BB/volume and overall signal
+    trend_code, rsi_code, bb_code, volume_code, overall_code = _score_ta(
+        current_price, lv.ma7, lv.ma20, lv.ma50, lv.rsi, lv.macd_hist, bb_position, lv.volume_ratio
+    )
+    trend, trend_strength = _TREND_LABELS[trend_code]
+    rsi_signal = _RSI_LABELS[rsi_code]
+    bb_signal = _BB_LABELS[bb_code]
+    volume_status = _VOLUME_LABELS[volume_code]
+    overall_signal = _OVERALL_LABELS[overall_code]
+
+    # Format comprehensive analysis message
+    analysis = _TA_TMPL.format_map({
+        'symbol': symbol,
+        'current_price': current_price,
+        'change_1h': change_1h,
+        'change_4h': change_4h,
+        'change_24h': change_24h,
+        'high': lv.high,
+        'low': lv.low,
+        'trend': trend,
+        'trend_strength': trend_strength,
+        'overall_signal': overall_signal,
+        'sma_7': lv.ma7,
+        'sma_20': lv.ma20,
+        'sma_50': lv.ma50,
+        'rsi': lv.rsi,
+        'rsi_signal': rsi_signal,
+        'macd_status': macd_status,
+        'bb_position': bb_position,
+        'bb_signal': bb_signal,
+        'volume': lv.volume,
+        'volume_status': volume_status,
+        'recent_high': recent_high,
+        'recent_low': recent_low,
+        'exchange': exchange_pref.upper(),
+        'market': market_pref.upper(),
+    })
+
+    await update.message.reply_text(analysis, parse_mode='Markdown')
+
+
+@handle_errors
+async def signals_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /signals command - Get signals for subscriptions"""
+    chat_id = update.effective_chat.id
+    db.update_last_active(chat_id)
+
+    # Get user subscriptions
+    subscriptions = db.get_user_subscriptions(chat_id)
 
-    except Exception as e:
-        logger.error(f"Error in subscribeall_command: {e}")
+    if not subscriptions:
         await update.message.reply_text(
-            TelegramFormatter.error_message(str(e)),
-            parse_mode='Markdown'
+            "You don't have any subscriptions.\n"
+            "Use /subscribe [symbol] to start monitoring a coin!"
+        )
+        return
+
+    # Fetch signals for each subscription
+    subscriptions = subscriptions[:5]  # Limit to 5 subscriptions
+    async with _loading(update, "Fetching signals"):
+        results = await asyncio.gather(
+            *(_fetch_klines('binance', 'spot_cached', sub['symbol'], "4h", 50) for sub in subscriptions),
+            return_exceptions=True
         )
 
+    signals_text = f"{TelegramFormatter.EMOJI['chart']} *Your Trading Signals*\n\n"
 
-async def trending_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /trending command - Show trending coins from Binance Futures"""
-    try:
-        chat_id = update.effective_chat.id
-        db.update_last_active(chat_id)
+    for sub, df in zip(subscriptions, results):
+        symbol = sub['symbol']
+        if isinstance(df, Exception):
+            logger.error(f"Error fetching signal for {symbol}: {df}")
+            continue
 
-        # Send loading message
-        loading_msg = await update.message.reply_text(
-            TelegramFormatter.loading_message("Fetching trending coins from Binance Futures")
-        )
+        if df is not None and len(df) > 0:
+            closes = df['close'].to_numpy()
+            current_price = closes[-1]
 
-        import requests
+            # Simple signal logic (only the latest SMA value is needed);
+            # fewer than 20 candles means no SMA yet, so HOLD
+            sma_20 = closes[-20:].mean() if len(closes) >= 20 else None
 
-        # Fetch top 20 by volume from Binance Futures
-        url = "https://fapi.binance.com/fapi/v1/ticker/24hr"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        # Filter USDT pairs and sort by volume
-        usdt_tickers = [
-            {
-                'symbol': t['symbol'],
-                'volume': float(t['quoteVolume']),
-                'change': float(t['priceChangePercent'])
-            }
-            for t in data
-            if t['symbol'].endswith('USDT')
-        ]
+            if sma_20 is None:
+                signal = "HOLD 🟡"
+            elif current_price > sma_20:
+                signal = "BUY 🟢"
+            elif current_price < sma_20:
+                signal = "SELL 🔴"
+            else:
+                signal = "HOLD 🟡"
 
-        # Sort by volume (descending)
-        usdt_tickers.sort(key=lambda x: x['volume'], reverse=True)
+            signals_text += f"*{symbol}*: {signal} (${current_price:,.2f})\n"
 
-        # Get top 15
-        top_tickers = usdt_tickers[:15]
+    await update.message.reply_text(signals_text, parse_mode='Markdown')
 
-        # Format message
-        trend_msg = f"{TelegramFormatter.EMOJI['fire']} *Top 15 Futures by Volume (24h)*\n\n"
 
-        for i, ticker in enumerate(top_tickers, 1):
-            volume_str = f"${ticker['volume']:,.0f}"
-            change_str = f"{ticker['change']:+.2f}%"
-            emoji = "🟢" if ticker['change'] >= 0 else "🔴"
-            trend_msg += f"{i}. *{ticker['symbol']}* {emoji} {change_str}\n"
+@handle_errors
+async def subscribeall_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /subscribeall command - Subscribe to all major pairs"""
+    chat_id = update.effective_chat.id
+    db.update_last_active(chat_id)
 
-        await loading_msg.delete()
-        await update.message.reply_text(trend_msg, parse_mode='Markdown')
+    # Major pairs
+    symbols = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT"]
 
-    except Exception as e:
-        logger.error(f"Error in trending_command: {e}")
-        await update.message.reply_text(
-            TelegramFormatter.error_message(str(e)),
-            parse_mode='Markdown'
-        )
+    added = 0
+    for symbol in symbols:
+        if db.add_subscription(chat_id, symbol):
+            added += 1
+
+    await update.message.reply_text(
+        TelegramFormatter.success_message(f"Subscribed to {added} major pairs")
+    )
+
+
+@handle_errors
+async def trending_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /trending command - Show trending coins from Binance Futures"""
+    chat_id = update.effective_chat.id
+    db.update_last_active(chat_id)
+
+    # Fetch top 20 by volume from Binance Futures
+    async with _loading(update, "Fetching trending coins from Binance Futures"):
+        url = "https://fapi.binance.com/fapi/v1/ticker/24hr"
+        session = context.bot_data['http_session']
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            response.raise_for_status()
+            data = _json_loads(await response.read())
+
+    # Top 15 USDT pairs by quote volume, filtered and selected in a single pass
+    top_tickers = heapq.nlargest(
+        15,
+        ((float(t['quoteVolume']), t) for t in data if t['symbol'].endswith('USDT')),
+        key=itemgetter(0)
+    )
+
+    # Format message
+    lines = []
+    for i, (_, ticker) in enumerate(top_tickers, 1):
+        change = float(ticker['priceChangePercent'])
+        emoji = "🟢" if change >= 0 else "🔴"
+        lines.append(f"{i}. *{ticker['symbol']}* {emoji} {change:+.2f}%\n")
+
+    trend_msg = f"{TelegramFormatter.EMOJI['fire']} *Top 15 Futures by Volume (24h)*\n\n" + "".join(lines)
+
+    await update.message.reply_text(trend_msg, parse_mode='Markdown')
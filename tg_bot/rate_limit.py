@@ -0,0 +1,84 @@
+"""
+Telegram Send Rate Limiting
+Shared pacing for worker notifications, kept under the bot-wide message limit
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from telegram import Bot
+from telegram.error import RetryAfter
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+
+class SendRateLimiter:
+    """Spaces out sends evenly so at most `rate` go out per `period` seconds,
+    and at most one per `chat_interval` seconds to the same chat"""
+
+    def __init__(self, rate: float = 28, period: float = 1.0, chat_interval: float = 1.0):
+        self.interval = period / rate
+        self.chat_interval = chat_interval
+        self._next_slot = 0.0
+        self._next_chat_slots: Dict[int, float] = {}
+
+    async def wait(self, chat_id: Optional[int] = None):
+        """Wait for the chat's next slot, then the next free global slot"""
+        # Slot reservation needs no lock: there is no await between read and write
+        if chat_id is not None:
+            now = time.monotonic()
+            chat_slot = max(now, self._next_chat_slots.get(chat_id, 0.0))
+            self._next_chat_slots[chat_id] = chat_slot + self.chat_interval
+            if len(self._next_chat_slots) > 1000:
+                self._prune(now)
+
+            if chat_slot > now:
+                await asyncio.sleep(chat_slot - now)
+
+        # Reserved only once the chat is due, so waiting chats don't hold back others
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        """Hold back every sender for `seconds` (Telegram flood control)"""
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+    def _prune(self, now: float):
+        """Forget chats whose next slot has already passed"""
+        self._next_chat_slots = {
+            chat_id: slot for chat_id, slot in self._next_chat_slots.items() if slot > now
+        }
+
+
+# Telegram allows ~30 messages/second per bot and ~1/second per chat; workers share one token
+telegram_limiter = SendRateLimiter(rate=28, period=1.0, chat_interval=1.0)
+
+
+def create_worker_bot(bot_token: str) -> Bot:
+    """Create a Bot whose connection pool is sized for concurrent worker sends"""
+    # The default pool holds a single connection, so concurrent sends would queue on it
+    request = HTTPXRequest(connection_pool_size=32, pool_timeout=30)
+    return Bot(token=bot_token, request=request)
+
+
+async def send_message(bot: Bot, chat_id: int, text: str, **kwargs):
+    """Send a message through the shared limiter, retrying once on flood control"""
+    await telegram_limiter.wait(chat_id)
+    try:
+        return await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+    except RetryAfter as e:
+        retry_after = e.retry_after
+        if hasattr(retry_after, 'total_seconds'):
+            retry_after = retry_after.total_seconds()
+        logger.warning(f"Flood control for {chat_id}, retrying in {retry_after}s")
+        # Flood control applies to the whole bot, so every sender backs off
+        telegram_limiter.pause(retry_after)
+        await telegram_limiter.wait(chat_id)
+        return await bot.send_message(chat_id=chat_id, text=text, **kwargs)
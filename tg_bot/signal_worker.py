@@ -5,87 +5,103 @@ Periodically checks subscriptions and sends notifications for trading signals
 
 import logging
 import asyncio
+from collections import ChainMap, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
-from telegram import Bot
-from telegram.error import TelegramError
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, List, Optional
 
 from config import config
 from tg_bot.database import db
 from tg_bot.formatter import TelegramFormatter
-from collector import CryptoDataCollector
+from tg_bot.rate_limit import create_worker_bot, send_message
+from collector import get_collector
 
 logger = logging.getLogger(__name__)
 
+# Latest indicator values needed to score a signal
+_SNAPSHOT_COLUMNS = ('close', 'MA20', 'MA50', 'RSI', 'MACD_hist')
+SignalSnapshot = namedtuple('SignalSnapshot', 'signal price rsi trend')
+
+# Dedicated pool for signal fetch + scoring, so a cycle never fills the
+# default executor that interactive handlers run on
+_SNAPSHOT_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="signal")
+
 
 class SignalWorker:
     """Background worker for checking and sending trading signals"""
 
     def __init__(self, bot_token: str):
         """Initialize signal worker"""
-        self.bot = Bot(token=bot_token)
-        self.collector = CryptoDataCollector()
-        self.last_signals: Dict[int, Dict[str, str]] = {}  # Track last signals per user
-
-    def get_overall_signal(self, df) -> str:
-        """Calculate overall trading signal from dataframe"""
+        self.bot = create_worker_bot(bot_token)
+        self.collector = get_collector()
+        self.last_signals: Dict[int, Dict[str, str]] = {}  # Track last signals per user, loaded from db
+        self._sent_signals: List[tuple] = []  # (chat_id, symbol, signal) not yet saved
+
+    def _fetch_klines(self, symbol: str, exchange_pref: str, market_pref: str):
+        """Fetch 4h klines for a symbol based on user preferences"""
+        if exchange_pref == 'bybit':
+            return self.collector.get_bybit_klines(symbol, "4h", limit=100)
+
+        # binance
+        if market_pref == 'futures':
+            return self.collector._get_binance_futures_klines(symbol, "4h", limit=100)
+        elif market_pref == 'spot':
+            return self.collector.get_binance_klines(symbol, "4h", limit=100,
+                                                     use_cache=False, save_cache=False)
+        else:  # auto
+            return self.collector.get_binance_klines_auto(symbol, "4h", limit=100)
+
+    def _load_snapshot(self, symbol: str, exchange_pref: str,
+                       market_pref: str) -> Optional[SignalSnapshot]:
+        """Fetch klines for a symbol and score them"""
+        return self.compute_signal_snapshot(self._fetch_klines(symbol, exchange_pref, market_pref))
+
+    async def _load_snapshots(self, keys: List[tuple]) -> Dict[tuple, Any]:
+        """Score (symbol, exchange, market) keys on the bounded signal pool"""
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(_SNAPSHOT_POOL, self._load_snapshot, *key) for key in keys),
+            return_exceptions=True
+        )
+        return dict(zip(keys, results))
+
+    def compute_signal_snapshot(self, df) -> Optional[SignalSnapshot]:
+        """Calculate overall trading signal and the values shown in its alert"""
         if df is None or len(df) < 50:
-            return "HOLD"
+            return None
 
-        # Calculate indicators
+        # Calculate indicators and read the latest values once
         df = self.collector.calculate_indicators(df)
-        latest = df.iloc[-1]
-        current_price = latest['close']
-
-        # Trend Analysis
-        sma_20 = df['MA20'].iloc[-1]
-        sma_50 = df['MA50'].iloc[-1]
-        sma_7 = df['MA7'].iloc[-1]
-
-        trend = "NEUTRAL"
-        if current_price > sma_7 > sma_20 > sma_50:
-            trend = "STRONG BULLISH"
-        elif current_price > sma_20 > sma_50:
-            trend = "BULLISH"
-        elif current_price < sma_7 < sma_20 < sma_50:
-            trend = "STRONG BEARISH"
+        current_price, sma_20, sma_50, rsi, macd_hist = (
+            df[col].to_numpy()[-1] for col in _SNAPSHOT_COLUMNS
+        )
+
+        # Trend Analysis (strong trends also satisfy these orderings)
+        if current_price > sma_20 > sma_50:
+            trend_score, trend = 1, "BULLISH 📈"
         elif current_price < sma_20 < sma_50:
-            trend = "BEARISH"
+            trend_score, trend = -1, "BEARISH 📉"
+        else:
+            trend_score, trend = 0, "NEUTRAL ⚪"
 
-        # RSI Analysis
-        rsi = latest['RSI']
+        # RSI Analysis: oversold = bullish, overbought = bearish
+        rsi_score = 1 if rsi < 30 else -1 if rsi > 70 else 0
 
         # MACD Analysis
-        macd_hist = latest['MACD_hist']
+        macd_score = 1 if macd_hist > 0 else -1
 
         # Calculate overall signal
-        signals = []
-        if trend in ["STRONG BULLISH", "BULLISH"]:
-            signals.append(1)
-        elif trend in ["STRONG BEARISH", "BEARISH"]:
-            signals.append(-1)
-        else:
-            signals.append(0)
-
-        if rsi < 30:
-            signals.append(1)  # Oversold = bullish
-        elif rsi > 70:
-            signals.append(-1)  # Overbought = bearish
-        else:
-            signals.append(0)
-
-        if macd_hist > 0:
-            signals.append(1)
-        else:
-            signals.append(-1)
-
-        signal_sum = sum(signals)
+        signal_sum = trend_score + rsi_score + macd_score
         if signal_sum >= 2:
-            return "BUY"
+            signal = "BUY"
         elif signal_sum <= -2:
-            return "SELL"
+            signal = "SELL"
         else:
-            return "HOLD"
+            signal = "HOLD"
+
+        return SignalSnapshot(signal, current_price, rsi, trend)
 
     def format_signal_message(self, symbol: str, signal: str, price: float,
                              rsi: float, trend: str) -> str:
@@ -109,54 +125,43 @@ class SignalWorker:
 Use /ta {symbol} for detailed analysis!
 """
 
-    async def check_user_subscriptions(self, chat_id: int) -> int:
-        """Check and send signals for user's subscriptions"""
-        try:
-            # Get user's subscriptions
-            subscriptions = db.get_user_subscriptions(chat_id)
+    async def check_user_subscriptions(self, chat_id: int, symbols: List[str],
+                                       market_pref: str = 'auto',
+                                       exchange_pref: str = 'binance',
+                                       snapshots: Optional[Dict[tuple, Any]] = None) -> int:
+        """Check and send signals for user's subscribed symbols
 
-            if not subscriptions:
+        snapshots maps (symbol, exchange, market) to a precomputed snapshot, None
+        (insufficient data) or exception; symbols missing from it are scored here.
+        """
+        try:
+            if not symbols:
                 return 0
 
-            # Get user preferences
-            market_pref = db.get_user_preference(chat_id, 'market_type', default='auto')
-            exchange_pref = db.get_user_preference(chat_id, 'exchange', default='binance')
-
             signals_sent = 0
 
             # Initialize last_signals for this user if not exists
             if chat_id not in self.last_signals:
                 self.last_signals[chat_id] = {}
 
-            for sub in subscriptions:
+            # Score symbols not precomputed for this cycle; the shared map is only read
+            keys = [(symbol, exchange_pref, market_pref) for symbol in symbols]
+            snapshots = snapshots or {}
+            missing = [key for key in keys if key not in snapshots]
+            if missing:
+                snapshots = ChainMap(await self._load_snapshots(missing), snapshots)
+
+            for symbol, key in zip(symbols, keys):
                 try:
-                    symbol = sub['symbol']
+                    snapshot = snapshots[key]
+                    if isinstance(snapshot, Exception):
+                        raise snapshot
 
-                    # Skip if we already sent this signal recently (prevent spam)
-                    # Check if signal changed from last time
-                    if symbol in self.last_signals[chat_id]:
-                        # We'll track signals to only notify on changes
-                        pass
-
-                    # Fetch data based on user preferences
-                    df = None
-                    if exchange_pref == 'bybit':
-                        df = self.collector.get_bybit_klines(symbol, "4h", limit=100)
-                    else:  # binance
-                        if market_pref == 'futures':
-                            df = self.collector._get_binance_futures_klines(symbol, "4h", limit=100)
-                        elif market_pref == 'spot':
-                            df = self.collector.get_binance_klines(symbol, "4h", limit=100,
-                                                                   use_cache=False, save_cache=False)
-                        else:  # auto
-                            df = self.collector.get_binance_klines_auto(symbol, "4h", limit=100)
-
-                    if df is None or len(df) < 50:
+                    if snapshot is None:
                         logger.warning(f"Insufficient data for {symbol} (chat_id: {chat_id})")
                         continue
 
-                    # Calculate signal
-                    signal = self.get_overall_signal(df)
+                    signal = snapshot.signal
 
                     # Only send BUY or SELL signals (not HOLD)
                     if signal not in ['BUY', 'SELL']:
@@ -169,43 +174,22 @@ Use /ta {symbol} for detailed analysis!
                         logger.debug(f"Signal unchanged for {symbol}: {signal}")
                         continue
 
-                    # Get additional info
-                    latest = df.iloc[-1]
-                    current_price = latest['close']
-                    rsi = latest['RSI']
-
-                    # Determine trend
-                    sma_20 = df['MA20'].iloc[-1]
-                    sma_50 = df['MA50'].iloc[-1]
-                    if current_price > sma_20 > sma_50:
-                        trend = "BULLISH 📈"
-                    elif current_price < sma_20 < sma_50:
-                        trend = "BEARISH 📉"
-                    else:
-                        trend = "NEUTRAL ⚪"
-
                     # Format and send message
                     message = self.format_signal_message(
-                        symbol, signal, current_price, rsi, trend
+                        symbol, signal, snapshot.price, snapshot.rsi, snapshot.trend
                     )
 
-                    await self.bot.send_message(
-                        chat_id=chat_id,
-                        text=message,
-                        parse_mode='Markdown'
-                    )
+                    await send_message(self.bot, chat_id, message, parse_mode='Markdown')
 
                     # Update last signal
                     self.last_signals[chat_id][symbol] = signal
+                    self._sent_signals.append((chat_id, symbol, signal))
                     signals_sent += 1
 
                     logger.info(f"Signal sent to {chat_id}: {symbol} - {signal}")
 
-                    # Small delay to avoid rate limiting
-                    await asyncio.sleep(1)
-
                 except Exception as e:
-                    logger.error(f"Error processing {sub.get('symbol', 'unknown')}: {e}")
+                    logger.error(f"Error processing {symbol}: {e}")
                     continue
 
             return signals_sent
@@ -219,37 +203,70 @@ Use /ta {symbol} for detailed analysis!
         try:
             logger.info("Starting signal check cycle...")
 
-            # Get all active subscriptions grouped by user
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT chat_id
-                FROM subscriptions
-            """)
-            rows = cursor.fetchall()
-            conn.close()
+            # Retry any signals a previous cycle failed to save
+            if self._sent_signals and db.set_last_signals(self._sent_signals):
+                self._sent_signals = []
+
+            # Reload last signals so change detection survives restarts,
+            # keeping still-unsaved ones so they are not sent again
+            last_signals = db.get_last_signals()
+            if last_signals is None:
+                # Without them every signal would look new and be sent again
+                logger.error("Could not load last signals, skipping signal check cycle")
+                return
+            self.last_signals = last_signals
+            for chat_id, symbol, signal in self._sent_signals:
+                self.last_signals.setdefault(chat_id, {})[symbol] = signal
+
+            # Get all subscriptions with user preferences in one query
+            rows = db.get_subscriptions_with_preferences()
 
             if not rows:
                 logger.info("No active subscriptions found")
                 return
 
-            chat_ids = [row[0] for row in rows]
+            # Group rows by user (already ordered by chat_id)
+            users = []
+            for chat_id, user_rows in groupby(rows, key=itemgetter('chat_id')):
+                user_rows = list(user_rows)
+                users.append((
+                    chat_id,
+                    [row['symbol'] for row in user_rows],
+                    user_rows[0]['market_type'],
+                    user_rows[0]['exchange'],
+                ))
+            chat_ids = [user[0] for user in users]
             logger.info(f"Checking signals for {len(chat_ids)} users")
 
+            # Fetch and score each (symbol, exchange, market) once for the whole cycle
+            keys = list({(row['symbol'], row['exchange'], row['market_type']) for row in rows})
+            snapshots = await self._load_snapshots(keys)
+            logger.info(f"Scored {len(keys)} unique symbols for {len(rows)} subscriptions")
+
+            # Check all users concurrently (sends are paced by the shared limiter);
+            # one failing user doesn't stop the rest
+            results = await asyncio.gather(
+                *(self.check_user_subscriptions(*user, snapshots=snapshots) for user in users),
+                return_exceptions=True
+            )
+
             total_signals = 0
-            for chat_id in chat_ids:
-                try:
-                    signals_sent = await self.check_user_subscriptions(chat_id)
-                    total_signals += signals_sent
-                except Exception as e:
-                    logger.error(f"Error processing chat_id {chat_id}: {e}")
+            for chat_id, result in zip(chat_ids, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error processing chat_id {chat_id}: {result}")
                     continue
+                total_signals += result
 
             logger.info(f"Signal check cycle completed. Sent {total_signals} signals")
 
         except Exception as e:
             logger.error(f"Error in signal check cycle: {e}")
 
+        finally:
+            # Save every signal sent this cycle in one batch
+            if self._sent_signals and db.set_last_signals(self._sent_signals):
+                self._sent_signals = []
+
 
 # Global instance
 _signal_worker: Optional[SignalWorker] = None